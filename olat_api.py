@@ -0,0 +1,387 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from olat_core import (
+    read_flashcards, generate_inline_single, generate_fib_single, create_groups,
+    generate_inline_group, generate_fib_group, parse_flashcards, parse_flashcards_json,
+    generate_line_output,
+)
+from olat_ingest import decode_bytes
+from olat_validate import validate_outputs
+
+# Lokaler HTTP-Dienst für die Konvertierungen, z. B.:
+#   curl --data-binary @deck.txt "http://127.0.0.1:8765/voci/group?group_size=3" -o out.zip
+
+MAX_BODY_BYTES = 5 * 1024 * 1024
+MAX_COVERAGE = 10  # wie in der Oberfläche
+
+
+def run_job(kind, text, params):
+    """
+    Runs one conversion in a worker process and returns a dict file name -> content;
+    the dict is empty if the deck contains no usable cards.
+    """
+    # Eigener Zufallsgenerator pro Auftrag, damit der Seed den Worker-Prozess nicht beeinflusst
+    rng = random.Random(params.get("seed"))
+
+    if kind == "dragdrop":
+        if params.get("input") == "json":
+            flashcards, max_back_lines = parse_flashcards_json(text)
+        else:
+            flashcards, max_back_lines = parse_flashcards(text)
+        lines = params.get("lines") or list(range(max_back_lines))
+        outputs = {}
+        for line_idx in lines:
+            output = generate_line_output(
+                flashcards, line_idx, params["title"], params["n_correct"],
+                schedule=params["schedule"], coverage=params["coverage"],
+                max_questions=params["max_questions"], max_points=params["max_points"], rng=rng,
+            )
+            if output:
+                outputs[f"dragdrop_zeile_{line_idx + 1}.txt"] = output
+        return outputs
+
+    flashcards = read_flashcards(text)
+    if not flashcards:
+        return {}
+    if kind == "voci/single":
+        return {
+            "inline_single.txt": generate_inline_single(flashcards, rng=rng),
+            "fib_single.txt": generate_fib_single(flashcards),
+        }
+    if kind == "fib/single":
+        return {"fib_single.txt": generate_fib_single(flashcards)}
+
+    group_size = params["group_size"]
+    groups = create_groups(flashcards, group_size, rng)
+    if kind == "voci/group":
+        return {
+            "inline_group.txt": generate_inline_group(
+                groups, group_size, max_distractors=params["max_distractors"], shuffle=params["shuffle"], rng=rng
+            ),
+            "fib_group.txt": generate_fib_group(groups, group_size),
+        }
+    if kind == "fib/group":
+        return {"fib_group.txt": generate_fib_group(groups, group_size)}
+    raise ValueError(f"Unbekannter Auftrag: {kind}")
+
+
+JOB_KINDS = ("voci/single", "voci/group", "fib/single", "fib/group", "dragdrop")
+
+
+def parse_params(kind, query):
+    """Validates the query parameters of a job; raises ValueError with a message for the client."""
+    def single(name, default=None):
+        values = query.get(name)
+        return values[0] if values else default
+
+    params = {}
+    seed = single("seed")
+    params["seed"] = int(seed) if seed is not None else None
+    if kind.endswith("/group"):
+        params["group_size"] = int(single("group_size", "2"))
+        if params["group_size"] < 2:
+            raise ValueError("group_size muss mindestens 2 sein.")
+        max_distractors = single("max_distractors")
+        params["max_distractors"] = int(max_distractors) if max_distractors else None
+        if params["max_distractors"] is not None and params["max_distractors"] < 1:
+            raise ValueError("max_distractors muss mindestens 1 sein.")
+        params["shuffle"] = single("shuffle", "0") in ("1", "true", "yes")
+    if kind == "dragdrop":
+        params["n_correct"] = int(single("n_correct", "4"))
+        if not 1 <= params["n_correct"] <= 6:
+            raise ValueError("n_correct muss zwischen 1 und 6 liegen.")
+        params["title"] = single("title", "Lernkarteien")
+        params["input"] = single("input", "text")
+        params["schedule"] = single("schedule", "random")
+        if params["schedule"] not in ("random", "balanced"):
+            raise ValueError("schedule muss 'random' oder 'balanced' sein.")
+        params["coverage"] = int(single("coverage", "1"))
+        if not 1 <= params["coverage"] <= MAX_COVERAGE:
+            raise ValueError(f"coverage muss zwischen 1 und {MAX_COVERAGE} liegen.")
+        # 0 bedeutet wie in der Oberfläche "unbegrenzt"
+        max_questions = single("max_questions")
+        params["max_questions"] = int(max_questions) if max_questions else None
+        if params["max_questions"] is not None and params["max_questions"] < 0:
+            raise ValueError("max_questions darf nicht negativ sein.")
+        params["max_questions"] = params["max_questions"] or None
+        max_points = single("max_points")
+        params["max_points"] = float(max_points) if max_points else None
+        if params["max_points"] is not None and not (math.isfinite(params["max_points"]) and params["max_points"] >= 0):
+            raise ValueError("max_points muss eine endliche Zahl ab 0 sein.")
+        params["max_points"] = params["max_points"] or None
+        lines = single("lines")
+        # Zeilen 1-basiert wie in der Oberfläche ("Zeile 1")
+        params["lines"] = [int(line) - 1 for line in lines.split(",")] if lines else None
+        if params["lines"] is not None and min(params["lines"]) < 0:
+            raise ValueError("lines darf nur Zeilennummern ab 1 enthalten.")
+    return params
+
+
+class Metrics:
+    """Thread-safe counters for the /metrics endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0, "timeouts": 0}
+        self.in_flight = 0
+        self.finished = 0
+        self.total_seconds = 0.0
+
+    def incr(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.finished += 1
+            self.total_seconds += seconds
+
+    def snapshot(self, capacity):
+        with self._lock:
+            return {
+                **self.counters,
+                "in_flight": self.in_flight,
+                "capacity": capacity,
+                "avg_job_seconds": self.total_seconds / self.finished if self.finished else 0.0,
+                "uptime_seconds": time.time() - self.started,
+            }
+
+
+class ChunkedWriter:
+    """Write-only stream that sends everything as HTTP/1.1 chunked transfer encoding."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii"))
+            self.wfile.write(data)
+            self.wfile.write(b"\r\n")
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def process_job(conn, kind, text, params):
+    """Entry point of a worker process: sends (True, outputs) or (False, error message) through `conn`."""
+    try:
+        conn.send((True, run_job(kind, text, params)))
+    except Exception as e:
+        conn.send((False, str(e)))
+    finally:
+        conn.close()
+
+
+class ConversionService:
+    """
+    Runs each job in its own worker process, at most `workers` at once, with a fixed number
+    of queue slots. A job that exceeds the timeout only terminates its own process.
+    """
+
+    def __init__(self, workers, queue_size, timeout, context=None):
+        self.workers = workers
+        self.context = context or multiprocessing.get_context()
+        self.running = threading.BoundedSemaphore(workers)
+        self.capacity = workers + queue_size
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.timeout = timeout
+        self.metrics = Metrics()
+        self._processes = set()
+        self._processes_lock = threading.Lock()
+
+    def submit(self, kind, text, params):
+        """Returns the job outputs; raises OverflowError if the queue is full, TimeoutError on timeout."""
+        if not self.slots.acquire(blocking=False):
+            self.metrics.incr("rejected")
+            raise OverflowError
+        self.metrics.begin()
+        started = time.monotonic()
+        try:
+            # Die Wartezeit in der Warteschlange zählt zum Zeitlimit
+            if not self.running.acquire(timeout=self.timeout):
+                self.metrics.incr("timeouts")
+                raise TimeoutError
+            try:
+                return self._run_process(kind, text, params, started + self.timeout)
+            finally:
+                self.running.release()
+        finally:
+            self.metrics.end(time.monotonic() - started)
+            self.slots.release()
+
+    def _run_process(self, kind, text, params, deadline):
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=process_job, args=(sender, kind, text, params), daemon=True)
+        process.start()
+        sender.close()
+        with self._processes_lock:
+            self._processes.add(process)
+        try:
+            if not receiver.poll(max(0.0, deadline - time.monotonic())):
+                self.metrics.incr("timeouts")
+                raise TimeoutError
+            try:
+                ok, result = receiver.recv()
+            except EOFError:
+                # Der Worker ist abgestürzt, ohne ein Ergebnis zu senden
+                process.join()
+                raise RuntimeError(f"Worker-Prozess unerwartet beendet (Exitcode {process.exitcode}).") from None
+            if not ok:
+                raise RuntimeError(result)
+            return result
+        finally:
+            receiver.close()
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            with self._processes_lock:
+                self._processes.discard(process)
+
+    def shutdown(self):
+        with self._processes_lock:
+            processes = list(self._processes)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None  # wird in serve() gesetzt
+
+    def send_json(self, status, payload, close=False):
+        """Sends a JSON reply; with `close` the connection is closed afterwards (e.g. if the body was not read)."""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def content_length(self):
+        """Content-Length of the request; raises ValueError if it is missing, not a number or negative."""
+        value = self.headers.get("Content-Length")
+        if value is None or not value.strip().isdigit():
+            raise ValueError("Content-Length fehlt oder ist ungültig.")
+        return int(value)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif path == "/metrics":
+            self.send_json(200, self.service.metrics.snapshot(self.service.capacity))
+        else:
+            self.send_json(404, {"error": "Unbekannter Pfad."})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        kind = url.path.strip("/")
+        # Ungelesene Anfragen beenden die Verbindung, sonst würde der Rest des Körpers
+        # auf einer Keep-alive-Verbindung als nächste Anfrage gelesen
+        if kind not in JOB_KINDS:
+            self.send_json(
+                404, {"error": f"Unbekannter Pfad. Erlaubt: {', '.join('/' + k for k in JOB_KINDS)}"}, close=True
+            )
+            return
+        self.service.metrics.incr("requests")
+
+        try:
+            length = self.content_length()
+        except ValueError as e:
+            self.service.metrics.incr("failed")
+            self.send_json(400, {"error": str(e)}, close=True)
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {"error": f"Eingabe zu gross (maximal {MAX_BODY_BYTES} Bytes)."}, close=True)
+            return
+        try:
+            text, _ = decode_bytes(self.rfile.read(length), MAX_BODY_BYTES)
+            params = parse_params(kind, parse_qs(url.query))
+        except ValueError as e:
+            self.service.metrics.incr("failed")
+            self.send_json(400, {"error": str(e)})
+            return
+
+        try:
+            outputs = self.service.submit(kind, text, params)
+        except OverflowError:
+            self.send_json(503, {"error": "Warteschlange voll, bitte später erneut versuchen."})
+            return
+        except TimeoutError:
+            self.send_json(504, {"error": "Zeitüberschreitung bei der Generierung."})
+            return
+        except Exception as e:
+            self.service.metrics.incr("failed")
+            self.send_json(500, {"error": f"Fehler bei der Generierung: {e}"})
+            return
+
+        if not outputs:
+            self.service.metrics.incr("failed")
+            self.send_json(422, {"error": "Keine gültigen Lernkarten gefunden oder zu wenige Karten."})
+            return
+
+        # Ergebnis der Formatprüfung als Header, damit Skripte fehlerhafte Dateien erkennen
+        problems = validate_outputs(outputs)
+        self.send_response(200)
+        self.send_header("X-Validation-Issues", str(sum(len(issues) for issues in problems.values())))
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", 'attachment; filename="flashcards_outputs.zip"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        stream = ChunkedWriter(self.wfile)
+        with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zf:
+            for file_name, content in outputs.items():
+                zf.writestr(file_name, content)
+        stream.close()
+        self.service.metrics.incr("completed")
+
+
+def serve(host="127.0.0.1", port=8765, workers=None, queue_size=16, timeout=60.0):
+    service = ConversionService(workers or os.cpu_count() or 1, queue_size, timeout)
+    handler = type("Handler", (ConversionHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"OLAT-Konvertierungsdienst läuft auf http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler HTTP-Dienst für die OLAT-Konvertierungen.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Worker-Prozesse (Standard: CPU-Anzahl)")
+    parser.add_argument("--queue", type=int, default=16, help="Anzahl wartender Aufträge zusätzlich zu den Workern")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Zeitlimit pro Auftrag in Sekunden")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.queue, args.timeout)
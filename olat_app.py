@@ -0,0 +1,13 @@
+import streamlit as st
+
+# Multipage-App: alle Converter laufen in einem Prozess und teilen sich
+# den Cache der geparsten Lernkarteien sowie den Worker-Pool (siehe olat_shared.py).
+st.set_page_config(page_title="OLAT Converter", page_icon="🎓")
+
+pages = [
+    st.Page("olat_voci.py", title="Voci: Inlinechoice & FIB", icon="📚", default=True),
+    st.Page("olat_flash.py", title="Drag&drop", icon="🧩"),
+    st.Page("olat_metrics.py", title="Metriken", icon="📊"),
+]
+
+st.navigation(pages).run()
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Prozessweiter Cache für geparste Decks und daraus abgeleitete Indizes (DistractorPool, CardIndex).
+# Schlüssel sind Inhalts-Hashes, damit alle Sessions mit demselben Deck dieselben Einträge nutzen.
+# Zwischengespeichert werden nur seed-unabhängige Daten; generierte Fragen gehören nicht hierher.
+
+DEFAULT_MAX_BYTES = int(os.environ.get("OLAT_DECK_CACHE_BYTES", 64 * 1024 * 1024))
+DEFAULT_TTL = float(os.environ.get("OLAT_DECK_CACHE_TTL", 3600))
+
+
+def content_digest(data):
+    """SHA-1 of a deck's content; str is hashed as UTF-8, bytes-like objects as they are."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def estimate_size(obj):
+    """
+    Approximate memory footprint of `obj` in bytes, following containers and instance
+    dicts; objects referenced several times (e.g. shared strings) are counted once.
+    """
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if isinstance(current, (str, bytes, int, float, bool)) or current is None:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+    return size
+
+
+class DeckCache:
+    """Thread-safe LRU cache with a memory budget in bytes and a time to live per entry."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, size, created)
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> Future einer laufenden Berechnung
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Returns (True, value) for a live entry and marks it as recently used, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[2] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value, size=None):
+        """Stores `value`, evicting least recently used entries until it fits; too large values are not stored."""
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            self._expire()
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            while self.bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (value, size, self.clock())
+            self.bytes += size
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value or stores and returns compute(); compute runs outside the lock.
+        Concurrent misses of the same key wait for the first caller's computation instead of
+        repeating it (and also receive its exception).
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        with self._lock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+        if not owner:
+            return pending.result()
+        try:
+            value = compute()
+            self.put(key, value)
+            pending.set_result(value)
+            return value
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+    def _expire(self):
+        now = self.clock()
+        for key in [key for key, (_, _, created) in self._entries.items() if now - created > self.ttl]:
+            self._remove(key)
+            self.expirations += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters and memory use, including entries and bytes per kind (first element of tuple keys)."""
+        with self._lock:
+            self._expire()
+            kinds = {}
+            for key, (_, size, _) in self._entries.items():
+                kind = key[0] if isinstance(key, tuple) else key
+                count, total = kinds.get(kind, (0, 0))
+                kinds[kind] = (count + 1, total + size)
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "kinds": kinds,
+            }
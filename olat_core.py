@@ -0,0 +1,674 @@
+import io
+import itertools
+import json
+import math
+import random
+import re
+import reprlib
+from collections import Counter
+
+from olat_store import card_hash, get_or_generate
+
+# Gemeinsame Logik aller Converter (Voci, FIB, Drag&drop) ohne Streamlit-Abhängigkeit,
+# damit sie von allen Seiten der Multipage-App und von Skripten genutzt werden kann.
+
+BLOCK_SEPARATOR = re.compile(r"\n[ \t]*\n")
+
+def split_blocks(text):
+    """Splits the raw deck text into non-empty card blocks (CRLF and whitespace-only separator lines allowed)."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return [block.strip() for block in BLOCK_SEPARATOR.split(text) if block.strip()]
+
+def iter_blocks(chunks):
+    """
+    Incremental split_blocks over an iterable of text chunks: yields each card block as
+    soon as the blank line after it has been read, without joining the chunks into one string.
+    """
+    block = []    # fertige Zeilen der aktuellen Karte
+    partial = []  # Teile der noch nicht abgeschlossenen Zeile
+    carry = ""
+    for chunk in chunks:
+        chunk = carry + chunk
+        carry = ""
+        if chunk.endswith("\r"):
+            # Könnte die erste Hälfte von "\r\n" sein
+            carry, chunk = "\r", chunk[:-1]
+        pieces = chunk.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        partial.append(pieces[0])
+        for piece in pieces[1:]:
+            line = "".join(partial)
+            partial = [piece]
+            if line.strip(" \t"):
+                block.append(line)
+            elif block:
+                text = "\n".join(block).strip()
+                block = []
+                if text:
+                    yield text
+    line = "".join(partial)
+    if line.strip(" \t"):
+        block.append(line)
+    text = "\n".join(block).strip()
+    if text:
+        yield text
+
+def balanced_schedule(num_cards, n_correct, coverage=1, rng=random):
+    """
+    Returns the correct-card indices per question as a balanced block design:
+    round-robin over `coverage` shuffled permutations of all indices, cut into
+    blocks of `n_correct`. Every card is a correct pair `coverage` times (cards
+    used to fill up the last block once more), using ceil(num_cards * coverage / n_correct)
+    questions in O(num_cards * coverage) time.
+    """
+    if num_cards < n_correct or n_correct < 1:
+        return []
+    sequence = []
+    for _ in range(coverage):
+        permutation = list(range(num_cards))
+        rng.shuffle(permutation)
+        # Der angefangene Block darf keine Karte zweimal enthalten: Kollisionen am
+        # Anfang der neuen Permutation mit Karten weiter hinten tauschen
+        tail = set(sequence[len(sequence) - len(sequence) % n_correct:])
+        head = n_correct - len(tail)
+        if tail:
+            swap_pos = head
+            for pos in range(head):
+                if permutation[pos] in tail:
+                    while permutation[swap_pos] in tail:
+                        swap_pos += 1
+                    permutation[pos], permutation[swap_pos] = permutation[swap_pos], permutation[pos]
+                    swap_pos += 1
+        sequence.extend(permutation)
+
+    blocks = [sequence[i:i + n_correct] for i in range(0, len(sequence), n_correct)]
+    last = blocks[-1]
+    if len(last) < n_correct:
+        used = set(last)
+        fillers = [i for i in rng.sample(range(num_cards), min(num_cards, n_correct + len(last))) if i not in used]
+        last.extend(fillers[:n_correct - len(last)])
+    return blocks
+
+class DistractorPool:
+    """Index of all answers of a deck for sampling distractors in O(1) expected time per card."""
+
+    def __init__(self, backs):
+        self.backs = list(backs)
+        self.counts = Counter(self.backs)
+        # Nur eine Antwort, die mehr als die Hälfte des Decks ausmacht, braucht die gefilterte
+        # Liste regelmässig; sie wird sofort berechnet, damit der Pool nach dem Einfügen in den
+        # Deck-Cache nicht mehr wächst
+        self._dominant = {}
+        if self.backs:
+            back, count = self.counts.most_common(1)[0]
+            if 2 * count > len(self.backs):
+                self._dominant[back] = [b for b in self.backs if b != back]
+
+    def others(self, back):
+        """All answers different from `back` in deck order (not to be modified)."""
+        dominant = self._dominant.get(back)
+        if dominant is not None:
+            return dominant
+        return [b for b in self.backs if b != back]
+
+    def sample(self, back, k, rng=random):
+        """Returns up to k answers different from `back`, drawn without replacement."""
+        if len(self.backs) - self.counts.get(back, 0) <= k:
+            return list(self.others(back))
+        # Positionen zufällig ziehen statt die ganze Liste zu filtern; nur wenn `back` fast
+        # das ganze Deck ausmacht, wird einmalig gefiltert
+        chosen = []
+        seen = set()
+        for _ in range(8 * k + 16):
+            pos = rng.randrange(len(self.backs))
+            if pos in seen:
+                continue
+            seen.add(pos)
+            if self.backs[pos] != back:
+                chosen.append(self.backs[pos])
+                if len(chosen) == k:
+                    return chosen
+        return rng.sample(self.others(back), k)
+
+
+# --- Voci (Inlinechoice / FIB) ---
+
+def read_flashcards(content):
+    return read_flashcards_blocks(split_blocks(content))
+
+def read_flashcards_blocks(raw_flashcards):
+    return [card for card in map(voci_card, raw_flashcards) if card is not None]
+
+def voci_card(block):
+    """Voci view of one card block: (back, front) from its first two lines, or None."""
+    lines = block.split('\n')
+    if len(lines) >= 2:
+        back = lines[0].strip()
+        front = lines[1].strip()
+        return back, front
+    return None
+
+def inline_single_item(back, front, flashcards, rng=random, pool=None):
+    if pool is None:
+        pool = DistractorPool(card[0] for card in flashcards)
+    return format_inline_single(back, front, pool.sample(back, 3, rng))
+
+def format_inline_single(back, front, choices):
+    choices_str = "|".join(choices)
+    output = "Type\tInlinechoice\n"
+    output += "Title\tWörter einordnen\n"
+    output += "Question\t✏✏Wählen Sie die richtigen Begriffe.✏✏\n"
+    output += "Points\t1\n"
+    output += f"Text\t{front} = \n"
+    output += f"1\t{choices_str}\t{back}\t|\n\n"
+    return output
+
+def fib_single_item(back, front):
+    output = "Type\tFIB\n"
+    output += "Title\t✏✏Vervollständigen Sie die Lücken mit dem korrekten Begriff.✏✏\n"
+    output += "Points\t1\n"
+    output += f"Text\t{front} = \n"
+    output += f"1\t{back}\t20\n\n"
+    return output
+
+def report_progress(items, progress):
+    """Iterates `items` and calls progress(done, total) before each item, if given."""
+    if progress is None:
+        yield from items
+        return
+    total = len(items)
+    for done, item in enumerate(items):
+        progress(done, total)
+        yield item
+    progress(total, total)
+
+def generate_inline_single(flashcards, progress=None, pool=None, rng=random):
+    if pool is None:
+        pool = DistractorPool(card[0] for card in flashcards)
+    return "".join(
+        inline_single_item(back, front, flashcards, rng, pool) for back, front in report_progress(flashcards, progress)
+    )
+
+def generate_fib_single(flashcards, progress=None):
+    return "".join(fib_single_item(back, front) for back, front in report_progress(flashcards, progress))
+
+def create_groups(flashcards, group_size, rng=random):
+    """
+    Puts every card into at least two groups of `group_size` cards without repeating a
+    card inside a group (only unavoidable if the deck is smaller than a group).
+    """
+    required_appearances = 2
+    if not flashcards:
+        return []
+    if len(flashcards) < group_size:
+        # Zu wenige Karten: jede Gruppe enthält alle Karten und wird mit Wiederholungen aufgefüllt
+        groups = []
+        for _ in range(required_appearances):
+            group = list(flashcards) + [rng.choice(flashcards) for _ in range(group_size - len(flashcards))]
+            rng.shuffle(group)
+            groups.append(group)
+        return groups
+
+    groups = [
+        [flashcards[i] for i in block]
+        for block in balanced_schedule(len(flashcards), group_size, required_appearances, rng)
+    ]
+    for group in groups:
+        rng.shuffle(group)
+    return groups
+
+def group_choices(group, max_distractors=None, shuffle=False, rng=random):
+    """
+    Distractor lists per card of a group. The distinct answers are collected once in group
+    order; each card gets the other answers in that order, or with `max_distractors` the next
+    ones after its own answer (cyclically), so its own answer is excluded by its index.
+    With `shuffle` the choices of each card are shuffled with `rng`.
+    """
+    distinct = list(dict.fromkeys(back for back, _ in group))
+    position = {back: i for i, back in enumerate(distinct)}
+    others = len(distinct) - 1
+    count = others if max_distractors is None else min(others, max_distractors)
+    choices = []
+    for back, _ in group:
+        i = position[back]
+        if count == others:
+            card_choices = distinct[:i] + distinct[i + 1:]
+        else:
+            card_choices = [distinct[(i + offset) % len(distinct)] for offset in range(1, count + 1)]
+        if shuffle:
+            rng.shuffle(card_choices)
+        choices.append(card_choices)
+    return choices
+
+def inline_group_item(group, group_size, max_distractors=None, shuffle=False, rng=random):
+    output = "Type\tInlinechoice\n"
+    output += "Title\tWörter einordnen\n"
+    output += "Question\t✏✏Wählen Sie die richtigen Begriffe.✏✏\n"
+    output += f"Points\t{group_size}\n"
+    for (back, front), distractors in zip(group, group_choices(group, max_distractors, shuffle, rng)):
+        choices_str = "|".join(distractors)
+        output += f"Text\t  // {front} = \n"
+        output += f"1\t{choices_str}\t{back}\t|\n"
+    output += "\n"
+    return output
+
+def fib_group_item(group, group_size):
+    output = "Type\tFIB\n"
+    output += "Title\t✏✏Vervollständigen Sie die Lücken mit dem korrekten Begriff.✏✏\n"
+    output += f"Points\t{group_size}\n"
+    for back, front in group:
+        output += f"Text\t  // {front} = \n"
+        output += f"1\t{back}\t20\n"
+    output += "\n"
+    return output
+
+def generate_inline_group(groups, group_size, progress=None, max_distractors=None, shuffle=False, rng=random):
+    return "".join(
+        inline_group_item(group, group_size, max_distractors, shuffle, rng) for group in report_progress(groups, progress)
+    )
+
+def generate_fib_group(groups, group_size, progress=None):
+    return "".join(fib_group_item(group, group_size) for group in report_progress(groups, progress))
+
+def generate_single_from_bank(bank, flashcards, seed, pool=None, progress=None):
+    """
+    Reuses stored single questions per card; only new or changed cards are generated.
+    For Inlinechoice the chosen distractors are stored per card and drawn again only
+    if one of them is no longer an answer of the deck (or the deck now allows more).
+    """
+    keyed = [(card_hash(back, front), (back, front)) for back, front in flashcards]
+    if pool is None:
+        pool = DistractorPool(card[0] for card in flashcards)
+
+    def draw(key, card):
+        return json.dumps(pool.sample(card[0], 3, random.Random(f"{seed}:{key}")), ensure_ascii=False)
+
+    def is_current(body, card):
+        try:
+            choices = json.loads(body)
+        except ValueError:
+            return False  # Eintrag aus einer älteren Version der Fragenbank
+        expected = min(3, len(pool.backs) - pool.counts.get(card[0], 0))
+        return (isinstance(choices, list) and len(choices) == expected
+                and all(choice != card[0] and pool.counts.get(choice) for choice in choices))
+
+    choices, new_cards = get_or_generate(
+        bank, "inline_single", keyed, draw, seed=seed, progress=progress, is_current=is_current,
+    )
+    inline = "".join(format_inline_single(back, front, json.loads(body)) for (back, front), body in zip(flashcards, choices))
+    fib, _ = get_or_generate(bank, "fib_single", keyed, lambda key, card: fib_single_item(*card), seed=seed)
+    return inline, "".join(fib), new_cards
+
+def create_groups_from_bank(bank, deck_key, flashcards, group_size, seed):
+    """Reuses the stored group assignment of an unchanged deck."""
+    (body,), _ = get_or_generate(
+        bank, "groups", [(deck_key, flashcards)],
+        lambda key, cards: json.dumps(create_groups(cards, group_size, random.Random(f"{seed}:{key}")), ensure_ascii=False),
+        params={"group_size": group_size}, seed=seed,
+    )
+    return [[tuple(card) for card in group] for group in json.loads(body)]
+
+# --- Drag&drop ---
+
+def clean_back_text(back_text):
+    """Cleans specific characters from the back text."""
+    return re.sub(r"[📌🔍👉]", "", back_text).strip()
+
+def replace_ss_with_ss(text):
+    """Replaces 'ß' with 'ss'."""
+    return text.replace("ß", "ss")
+
+def parse_flashcards(text):
+    """Parses the input flashcards into structured data."""
+    return parse_flashcards_blocks(split_blocks(text))
+
+def parse_flashcards_blocks(blocks):
+    """Parses already split card blocks into structured data."""
+    flashcards = []
+    max_back_lines = 0  # To track the maximum number of back lines
+
+    for block in blocks:
+        card = dragdrop_card(block)
+        if card is None:
+            continue
+        flashcards.append(card)
+        if len(card["clean_backs"]) > max_back_lines:
+            max_back_lines = len(card["clean_backs"])
+
+    return flashcards, max_back_lines
+
+def dragdrop_card(block):
+    """Drag&drop view of one card block: front and cleaned back lines, or None."""
+    lines = [l.strip() for l in block.split('\n') if l.strip()]
+    if len(lines) < 2:
+        return None  # At least front and one back line
+    front = replace_ss_with_ss(lines[0])  # Replace ß with ss
+    backs = [replace_ss_with_ss(line) for line in lines[1:]]
+    clean_backs = [clean_back_text(back) for back in backs]
+    return {
+        "front": front,
+        "clean_backs": clean_backs
+    }
+
+def parse_flashcards_json(json_text, messages=None):
+    """
+    Parses flashcards from JSON input.
+    Problems are appended to `messages` as ("error" | "warning", text) tuples.
+    """
+    if messages is None:
+        messages = []
+    flashcards = []
+    max_back_lines = 0
+
+    try:
+        data = json.loads(json_text)
+        if not isinstance(data, list):
+            messages.append(("error", "Ungültiges JSON-Format: Das oberste Element muss eine Liste sein."))
+            return [], 0
+
+        for item in data:
+            if not isinstance(item, dict) or "question" not in item or "answer" not in item:
+                messages.append(("warning", f"Überspringe ungültigen Eintrag im JSON: {reprlib.repr(item)}"))
+                continue
+
+            front = replace_ss_with_ss(str(item["question"]))
+            answer_text = str(item["answer"])
+            # Split answer by newline, handle potential multiple newlines
+            backs = [replace_ss_with_ss(line.strip()) for line in answer_text.split('\n') if line.strip()]
+            clean_backs = [clean_back_text(back) for back in backs]
+
+            if not front or not clean_backs:
+                messages.append(("warning", f"Überspringe Eintrag wegen fehlender Vorder- oder Rückseite: {reprlib.repr(item)}"))
+                continue
+
+            flashcards.append({
+                "front": front,
+                "clean_backs": clean_backs
+            })
+            if len(clean_backs) > max_back_lines:
+                max_back_lines = len(clean_backs)
+
+    except json.JSONDecodeError:
+        messages.append(("error", "Ungültiges JSON-Format. Bitte überprüfen Sie Ihre Eingabe."))
+        return [], 0
+    except Exception as e:
+        messages.append(("error", f"Ein Fehler ist beim Verarbeiten des JSON aufgetreten: {e}"))
+        return [], 0
+
+    return flashcards, max_back_lines
+
+def check_uniform_back_lines(flashcards):
+    """Checks if all flashcards have the same number of back lines."""
+    if not flashcards:
+        return False, 0
+    first_len = len(flashcards[0]["clean_backs"])
+    for card in flashcards:
+        if len(card["clean_backs"]) != first_len:
+            return False, first_len
+    return True, first_len
+
+TOTAL_FRONTS = 8  # Anzahl Begriffe pro Drag&drop-Frage
+
+def build_question(selected_correct_fronts, selected_incorrect_fronts, selected_correct_backs, title, n_correct, rng=random):
+    """Builds the padded rows of one Drag&drop question."""
+    # **Keine Shuffle der Backs**
+    shuffled_backs = selected_correct_backs.copy()
+
+    # Assign each correct front to one back using front text as key
+    front_to_back = dict(zip([c["front"] for c in selected_correct_fronts], shuffled_backs))
+
+    # Combine correct and incorrect fronts
+    all_fronts = selected_correct_fronts + selected_incorrect_fronts
+    rng.shuffle(all_fronts)
+
+    # Prepare the question data
+    question_data = []
+    backs_header = [""] + shuffled_backs
+    num_columns = len(backs_header)
+
+    # Helper function to pad rows
+    def pad_row(row, total_cols):
+        return row + [""] * (total_cols - len(row))
+
+    # Add Typ, Title, Question, Points with padding
+    question_data.append(pad_row(["Typ", "Drag&drop"], num_columns))
+    question_data.append(pad_row(["Title", title], num_columns))
+    question_data.append(pad_row(
+        [ "Question", f"Ordnen Sie die Begriffe den korrekten Erklärungen zu. ❗ Achtung: Genau {n_correct} Begriffe können zugeordnet werden."],
+        num_columns
+    ))
+    question_data.append(pad_row(["Points", f"{0.5 * n_correct}"], num_columns))
+
+    # Add backs_header
+    question_data.append(backs_header)
+
+    # Add front cards with points
+    for front in all_fronts:
+        row = [front["front"]]
+        if front["front"] in front_to_back:
+            correct_back = front_to_back[front["front"]]
+            for back in shuffled_backs:
+                if back == correct_back:
+                    row.append("0.5")
+                else:
+                    row.append("-0.25")
+        else:
+            row.extend(["-0.25"] * n_correct)
+        row = pad_row(row, num_columns)
+        question_data.append(row)
+
+    return question_data
+
+class CardIndex:
+    """Positions of identical cards, for drawing incorrect fronts without scanning the deck."""
+
+    def __init__(self, flashcards):
+        self.flashcards = flashcards
+        self.keys = [(card["front"], tuple(card["clean_backs"])) for card in flashcards]
+        self.positions = {}
+        for pos, key in enumerate(self.keys):
+            self.positions.setdefault(key, []).append(pos)
+
+    def sample_excluding(self, excluded_cards, count, rng=random):
+        """
+        Draws `count` cards that are not equal to any of `excluded_cards`, or returns None
+        if the deck has too few. Expected O(count) via rejection sampling; decks that
+        consist almost only of excluded duplicates fall back to the position index.
+        """
+        excluded = {(card["front"], tuple(card["clean_backs"])) for card in excluded_cards}
+        available = len(self.flashcards) - sum(len(self.positions.get(key, ())) for key in excluded)
+        if available < count:
+            return None
+        chosen = []
+        seen = set()
+        for _ in range(8 * count + 16):
+            if len(chosen) == count:
+                return chosen
+            pos = rng.randrange(len(self.flashcards))
+            if pos in seen:
+                continue
+            seen.add(pos)
+            if self.keys[pos] not in excluded:
+                chosen.append(self.flashcards[pos])
+        if len(chosen) == count:
+            return chosen
+        remaining = [pos for key, positions in self.positions.items() if key not in excluded for pos in positions]
+        return [self.flashcards[pos] for pos in rng.sample(remaining, count)]
+
+PREVIEW_QUESTIONS = 3  # Anzahl Fragen, die schon während der Generierung angezeigt werden
+
+def generate_questions(flashcards, correct_line_index, title, n_correct, rng=random, schedule="random", coverage=1):
+    """Generates question sets based on flashcards."""
+    return list(iter_questions(flashcards, correct_line_index, title, n_correct, rng, schedule, coverage))
+
+def iter_questions(flashcards, correct_line_index, title, n_correct, rng=random, schedule="random", coverage=1,
+                   max_questions=None, max_points=None, card_index=None):
+    """
+    Lazily yields questions, stopping after `max_questions` or before the total
+    points would exceed `max_points` (each question is worth 0.5 * n_correct).
+    A prebuilt CardIndex of `flashcards` can be passed as `card_index`.
+    """
+    limit = max_questions
+    if max_points is not None:
+        by_points = int(max_points // (0.5 * n_correct))
+        limit = by_points if limit is None else min(limit, by_points)
+    questions = _iter_questions(flashcards, correct_line_index, title, n_correct, rng, schedule, coverage, card_index)
+    return questions if limit is None else itertools.islice(questions, limit)
+
+def _iter_questions(flashcards, correct_line_index, title, n_correct, rng, schedule, coverage, card_index=None):
+    """
+    schedule="random" draws the correct pairs at random for len(flashcards) questions;
+    schedule="balanced" uses balanced_schedule so every card is a correct pair `coverage` times.
+    """
+    total_fronts = TOTAL_FRONTS
+    if len(flashcards) < total_fronts:
+        return
+    if card_index is None:
+        card_index = CardIndex(flashcards)
+
+    if schedule == "balanced":
+        # Nur Karten mit der gewünschten Rückseitenzeile können korrekte Paare sein
+        eligible = [i for i, card in enumerate(flashcards) if len(card["clean_backs"]) > correct_line_index]
+        for block in balanced_schedule(len(eligible), n_correct, coverage, rng):
+            selected_correct_fronts = [flashcards[eligible[i]] for i in block]
+            selected_incorrect_fronts = card_index.sample_excluding(selected_correct_fronts, total_fronts - n_correct, rng)
+            if selected_incorrect_fronts is None:
+                continue  # Not enough incorrect fronts
+            yield build_question(
+                selected_correct_fronts,
+                selected_incorrect_fronts,
+                [card["clean_backs"][correct_line_index] for card in selected_correct_fronts],
+                title, n_correct, rng,
+            )
+        return
+
+    for _ in range(len(flashcards)):  # Iterate enough times to generate multiple questions
+        # Select n_correct correct fronts
+        selected_correct_fronts = rng.sample(flashcards, n_correct)
+        selected_correct_backs = []
+        for front in selected_correct_fronts:
+            try:
+                back = front["clean_backs"][correct_line_index]
+                selected_correct_backs.append(back)
+            except IndexError:
+                # Skip if any selected front does not have the required back line
+                selected_correct_backs = []
+                break
+
+        if len(selected_correct_backs) != n_correct:
+            continue  # Skip this iteration if backs are insufficient
+
+        # Select (total_fronts - n_correct) incorrect fronts
+        selected_incorrect_fronts = card_index.sample_excluding(selected_correct_fronts, total_fronts - n_correct, rng)
+        if selected_incorrect_fronts is None:
+            continue  # Not enough incorrect fronts
+
+        yield build_question(
+            selected_correct_fronts, selected_incorrect_fronts, selected_correct_backs, title, n_correct, rng
+        )
+
+def coverage_stats(flashcards, formatted_output):
+    """Counts how often each card is a correct pair in a formatted Drag&drop output."""
+    counts = dict.fromkeys((card["front"] for card in flashcards), 0)
+    questions = 0
+    row_index = 0
+    for line in formatted_output.split("\n"):
+        cells = line.split("\t")
+        if not line:
+            row_index = 0
+            continue
+        if row_index == 0:
+            questions += 1
+        # Zeilen 0-4 sind Typ, Title, Question, Points und die Kopfzeile mit den Rückseiten
+        elif row_index >= 5 and "0.5" in cells[1:]:
+            counts[cells[0]] = counts.get(cells[0], 0) + 1
+        row_index += 1
+    values = list(counts.values()) or [0]
+    return {
+        "questions": questions,
+        "min": min(values),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+        "uncovered": sum(1 for value in values if value == 0),
+    }
+
+def iter_formatted_questions(questions):
+    """Yields each question as a formatted text block, consuming `questions` lazily."""
+    for q_data in questions:
+        yield "\n".join("\t".join(row) for row in q_data)
+
+def write_questions(questions, out, preview=None, progress=None, expected=1):
+    """
+    Streams the formatted questions into the text file `out` and returns their count.
+    The first PREVIEW_QUESTIONS blocks are also appended to the list `preview`, if given;
+    progress(done, expected) is called after each question.
+    """
+    count = 0
+    for block in iter_formatted_questions(questions):
+        if count:
+            out.write("\n\n")  # Separator between questions
+        out.write(block)
+        if preview is not None and count < PREVIEW_QUESTIONS:
+            preview.append(block)
+        count += 1
+        if progress is not None:
+            progress(count, max(count, expected))
+    return count
+
+def format_questions(questions):
+    """Formats the questions for display or download."""
+    return "\n\n".join(iter_formatted_questions(questions))
+
+def expected_question_count(num_cards, n_correct, schedule="random", coverage=1, max_questions=None, max_points=None):
+    """Upper estimate of the number of questions iter_questions yields (for progress bars)."""
+    count = math.ceil(num_cards * coverage / n_correct) if schedule == "balanced" else num_cards
+    if max_questions is not None:
+        count = min(count, max_questions)
+    if max_points is not None:
+        count = min(count, int(max_points // (0.5 * n_correct)))
+    return count
+
+def format_line_output(flashcards, correct_line_index, title, n_correct, rng=random, schedule="random", coverage=1,
+                       max_questions=None, max_points=None, preview=None, progress=None, card_index=None):
+    """Generates and formats the questions of one back line in a single streaming pass."""
+    out = io.StringIO()
+    write_questions(
+        iter_questions(
+            flashcards, correct_line_index, title, n_correct, rng, schedule, coverage, max_questions, max_points, card_index
+        ),
+        out, preview, progress,
+        expected_question_count(len(flashcards), n_correct, schedule, coverage, max_questions, max_points),
+    )
+    return out.getvalue()
+
+def generate_formatted_from_bank(bank, flashcards, correct_line_index, title, n_correct, seed, schedule="random", coverage=1,
+                                 max_questions=None, max_points=None, preview=None, progress=None, card_index=None):
+    """Reuses the stored Drag&drop output of an unchanged deck for the same parameters."""
+    cards = [(card["front"], *card["clean_backs"]) for card in flashcards]
+    deck_key = bank.save_deck(cards)
+    (body,), _ = get_or_generate(
+        bank, "dragdrop", [(deck_key, flashcards)],
+        lambda key, cards: format_line_output(
+            cards, correct_line_index, title, n_correct, random.Random(f"{seed}:{key}:{correct_line_index}"),
+            schedule, coverage, max_questions, max_points, progress=progress, card_index=card_index),
+        params={
+            "line": correct_line_index, "title": title, "n_correct": n_correct, "schedule": schedule,
+            "coverage": coverage, "max_questions": max_questions, "max_points": max_points,
+        },
+        seed=seed,
+    )
+    if preview is not None:
+        preview.extend(body.split("\n\n")[:PREVIEW_QUESTIONS])
+    return body
+
+def generate_line_output(flashcards, correct_line_index, title, n_correct, bank=None, seed=0, schedule="random", coverage=1,
+                         max_questions=None, max_points=None, preview=None, progress=None, card_index=None, rng=random):
+    """Generates the formatted Drag&drop output for one back line, via the question bank if given, else with `rng`."""
+    if bank is not None:
+        return generate_formatted_from_bank(
+            bank, flashcards, correct_line_index, title, n_correct, seed, schedule, coverage,
+            max_questions, max_points, preview, progress, card_index,
+        )
+    return format_line_output(
+        flashcards, correct_line_index, title, n_correct, rng, schedule, coverage,
+        max_questions, max_points, preview, progress, card_index,
+    )
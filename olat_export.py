@@ -0,0 +1,487 @@
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+from olat_cache import content_digest
+from olat_core import (
+    DistractorPool, create_groups, dragdrop_card, expected_question_count, fib_group_item, fib_single_item,
+    inline_group_item, inline_single_item, iter_blocks, iter_questions, voci_card, write_questions,
+)
+from olat_ingest import ingest_bytes
+from olat_validate import print_results, validate_output
+
+# Export in alle Formate mit einem einzigen Parse-Durchgang: jede Karte und jede Gruppe
+# läuft einmal durch alle gewählten Emitter, z. B.:
+#   python olat_export.py deck.txt -o export.zip --formats inline_single,fib_group,dragdrop,quizlet_tsv
+# oder für einen ganzen Ordner, der laufend abgeglichen wird:
+#   python olat_export.py --watch decks/ -o exports/
+
+FORMAT_LABELS = {
+    "inline_single": "Einzelne Fragen: Inlinechoice",
+    "fib_single": "Einzelne Fragen: FIB",
+    "inline_group": "Gruppierte Fragen: Inlinechoice",
+    "fib_group": "Gruppierte Fragen: FIB",
+    "dragdrop": "Drag&drop (eine Datei pro Rückseitenzeile)",
+    "quizlet_tsv": "Quizlet (TSV)",
+    "quizlet_csv": "Quizlet (CSV)",
+}
+EXPORT_FORMATS = tuple(FORMAT_LABELS)
+
+# Ausgaben bis zu dieser Grösse bleiben im Speicher, grössere werden in eine temporäre Datei ausgelagert
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+class SpooledText:
+    """Text sink that encodes to UTF-8 into a SpooledTemporaryFile."""
+
+    def __init__(self):
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+    def write(self, text):
+        self.buffer.write(text.encode("utf-8"))
+        return len(text)
+
+    def copy_to(self, out):
+        self.buffer.seek(0)
+        shutil.copyfileobj(self.buffer, out)
+
+    def getvalue(self):
+        self.buffer.seek(0)
+        return self.buffer.read()
+
+    def close(self):
+        self.buffer.close()
+
+
+class Emitter:
+    """One output file of the export; receives every card and group of the shared pass."""
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.out = SpooledText()
+
+    def card(self, lines, voci):
+        pass
+
+    def group(self, group):
+        pass
+
+
+class InlineSingleEmitter(Emitter):
+    def __init__(self, pool, rng):
+        super().__init__("inline_single.txt")
+        self.pool = pool
+        self.rng = rng
+
+    def card(self, lines, voci):
+        if voci is not None:
+            self.out.write(inline_single_item(voci[0], voci[1], None, self.rng, self.pool))
+
+
+class FibSingleEmitter(Emitter):
+    def __init__(self):
+        super().__init__("fib_single.txt")
+
+    def card(self, lines, voci):
+        if voci is not None:
+            self.out.write(fib_single_item(*voci))
+
+
+class InlineGroupEmitter(Emitter):
+    def __init__(self, group_size, max_distractors, shuffle, rng):
+        super().__init__("inline_group.txt")
+        self.group_size = group_size
+        self.max_distractors = max_distractors
+        self.shuffle = shuffle
+        self.rng = rng
+
+    def group(self, group):
+        self.out.write(inline_group_item(group, self.group_size, self.max_distractors, self.shuffle, self.rng))
+
+
+class FibGroupEmitter(Emitter):
+    def __init__(self, group_size):
+        super().__init__("fib_group.txt")
+        self.group_size = group_size
+
+    def group(self, group):
+        self.out.write(fib_group_item(group, self.group_size))
+
+
+def quizlet_row(lines):
+    """Term and definition of a card block for the Quizlet import, or None."""
+    lines = [line.strip() for line in lines if line.strip()]
+    if len(lines) < 2:
+        return None
+    # Quizlet kennt keine mehrzeiligen Definitionen: weitere Rückseitenzeilen anhängen
+    return lines[0], "; ".join(lines[1:])
+
+
+class QuizletTsvEmitter(Emitter):
+    def __init__(self):
+        super().__init__("quizlet.tsv")
+
+    def card(self, lines, voci):
+        row = quizlet_row(lines)
+        if row is not None:
+            self.out.write("\t".join(cell.replace("\t", " ") for cell in row) + "\n")
+
+
+class QuizletCsvEmitter(Emitter):
+    def __init__(self):
+        super().__init__("quizlet.csv")
+        self.writer = csv.writer(self.out, lineterminator="\n")
+
+    def card(self, lines, voci):
+        row = quizlet_row(lines)
+        if row is not None:
+            self.writer.writerow(row)
+
+
+def export_deck(blocks, formats=EXPORT_FORMATS, group_size=2, n_correct=4, title="Lernkarteien", schedule="random",
+                coverage=1, max_distractors=None, shuffle_choices=False, rng=random, progress=None):
+    """
+    Parses the card blocks once and writes every selected format from that single parse:
+    one pass over the cards feeds all card emitters, one pass over the groups all group
+    emitters, and Drag&drop streams its questions per back line. Returns a dict
+    file name -> SpooledText; progress(done, total) is called along the way.
+    """
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unbekannte Formate: {', '.join(sorted(unknown))}")
+
+    # Einziger Parse-Durchgang: alle Sichten einer Karte werden aus demselben Block abgeleitet
+    cards = []
+    voci_cards = []
+    dragdrop_cards = []
+    for block in blocks:
+        lines = block.split("\n")
+        voci = voci_card(block)
+        cards.append((lines, voci))
+        if voci is not None:
+            voci_cards.append(voci)
+        if "dragdrop" in formats:
+            card = dragdrop_card(block)
+            if card is not None:
+                dragdrop_cards.append(card)
+
+    card_emitters = []
+    if "inline_single" in formats:
+        card_emitters.append(InlineSingleEmitter(DistractorPool(back for back, _ in voci_cards), rng))
+    if "fib_single" in formats:
+        card_emitters.append(FibSingleEmitter())
+    if "quizlet_tsv" in formats:
+        card_emitters.append(QuizletTsvEmitter())
+    if "quizlet_csv" in formats:
+        card_emitters.append(QuizletCsvEmitter())
+    group_emitters = []
+    if "inline_group" in formats:
+        group_emitters.append(InlineGroupEmitter(group_size, max_distractors, shuffle_choices, rng))
+    if "fib_group" in formats:
+        group_emitters.append(FibGroupEmitter(group_size))
+
+    groups = create_groups(voci_cards, group_size, rng) if group_emitters and voci_cards else []
+    max_back_lines = max((len(card["clean_backs"]) for card in dragdrop_cards), default=0)
+    line_counts = [
+        expected_question_count(len(dragdrop_cards), n_correct, schedule, coverage) for _ in range(max_back_lines)
+    ]
+    total = (len(cards) if card_emitters else 0) + len(groups) + sum(line_counts)
+    done = 0
+
+    def report(value):
+        nonlocal done
+        done = value
+        if progress is not None:
+            progress(done, max(total, done))
+
+    if card_emitters:
+        for lines, voci in cards:
+            for emitter in card_emitters:
+                emitter.card(lines, voci)
+            report(done + 1)
+    for group in groups:
+        for emitter in group_emitters:
+            emitter.group(group)
+        report(done + 1)
+
+    files = {emitter.file_name: emitter.out for emitter in card_emitters + group_emitters}
+    for line_idx, expected in enumerate(line_counts):
+        out = SpooledText()
+        offset = done
+        count = write_questions(
+            iter_questions(dragdrop_cards, line_idx, title, n_correct, rng, schedule, coverage),
+            out, progress=lambda count, _: report(offset + count), expected=expected,
+        )
+        if count:
+            files[f"dragdrop_zeile_{line_idx + 1}.txt"] = out
+        else:
+            out.close()
+        report(offset + expected)
+    return files
+
+
+def write_zip(files, out):
+    """Copies the spooled outputs into a ZIP archive written to the binary stream `out`."""
+    # zipfile erlaubt nur einen offenen Schreib-Handle pro Archiv, daher wird erst gepuffert und dann kopiert
+    # Niedrige Kompressionsstufe: Textausgaben werden trotzdem stark verkleinert, aber deutlich schneller
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for file_name, sink in files.items():
+            with zf.open(file_name, "w") as entry:
+                sink.copy_to(entry)
+
+
+def validate_files(files):
+    """Validates the spooled outputs; returns file name -> (records, issues)."""
+    return {file_name: validate_output(file_name, sink.getvalue()) for file_name, sink in files.items()}
+
+
+def export_bytes(data, out, formats=EXPORT_FORMATS, validate=False, **options):
+    """
+    Decodes a deck (with encoding detection) and writes the export ZIP to `out`; returns the
+    file names and, if `validate` is set, the validation results per file.
+    """
+    blocks, _ = ingest_bytes(data, lambda chunks: list(iter_blocks(chunks)), max_bytes=len(data))
+    files = export_deck(blocks, formats, **options)
+    results = validate_files(files) if validate else {}
+    write_zip(files, out)
+    for sink in files.values():
+        sink.close()
+    return list(files), results
+
+
+def export_file(path, out, formats=EXPORT_FORMATS, validate=False, **options):
+    """Like export_bytes for a deck file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return export_bytes(data, out, formats, validate, **options)
+
+
+# --- Beobachtungsmodus: Ordner regelmässig abgleichen und nur neue oder geänderte Decks konvertieren ---
+
+INDEX_FILE = ".olat_index.json"
+INDEX_VERSION = 1
+DECK_SUFFIX = ".txt"
+
+
+def scan_decks(root, skip=None):
+    """
+    Yields (relative path, mtime_ns, size) of all deck files below `root`. Only directory
+    entries and their stat data are read, never file contents; hidden entries are skipped,
+    as are files and subfolders deleted during the scan. A missing `root` raises OSError.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        if skip is not None and os.path.abspath(directory) == skip:
+            continue
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            if directory == root:
+                raise
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if not (entry.name.endswith(DECK_SUFFIX) and entry.is_file()):
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(entry.path, root), stat.st_mtime_ns, stat.st_size
+
+
+def load_index(path, options):
+    """Loads the deck index; an index written with other export options is discarded."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION or index.get("options") != options:
+        return {}
+    return index.get("decks", {})
+
+
+def save_index(path, decks, options):
+    """Writes the index atomically so an interrupted run never leaves a broken file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "options": options, "decks": decks}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def output_path(out_dir, rel_path):
+    return os.path.join(out_dir, os.path.splitext(rel_path)[0] + ".zip")
+
+
+def convert_deck(data, target, formats, validate, options, seed):
+    """Converts one deck into `target` via a temporary file; returns the validation results."""
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_target = f"{target}.tmp"
+    # Mit Seed hängt das Ergebnis nur vom Inhalt ab, nicht von der Reihenfolge der Konvertierungen
+    rng = random.Random(f"{seed}:{content_digest(data)}") if seed is not None else random
+    try:
+        with open(tmp_target, "wb") as out:
+            _, results = export_bytes(data, out, formats, validate, rng=rng, **options)
+        os.replace(tmp_target, target)
+    except BaseException:
+        # Keine halb geschriebenen Dateien im Zielordner zurücklassen
+        if os.path.exists(tmp_target):
+            os.remove(tmp_target)
+        raise
+    return results
+
+
+def sync_folder(src_dir, out_dir, formats=EXPORT_FORMATS, validate=False, seed=None, **options):
+    """
+    Brings `out_dir` up to date with the decks in `src_dir` and returns a summary dict.
+    Files whose mtime and size match the index are skipped without being opened; changed
+    files are hashed and only reconverted if their content hash differs. Outputs of
+    deleted decks are removed.
+    """
+    index_path = os.path.join(out_dir, INDEX_FILE)
+    index_options = {"formats": list(formats), "seed": seed, **options}
+    decks = load_index(index_path, index_options)
+    summary = {"converted": [], "removed": [], "failed": [], "unchanged": 0, "problems": {}}
+    changed = False
+    seen = set()
+
+    for rel_path, mtime_ns, size in scan_decks(src_dir, skip=os.path.abspath(out_dir)):
+        seen.add(rel_path)
+        entry = decks.get(rel_path)
+        if entry is not None and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+            summary["unchanged"] += 1
+            continue
+        changed = True
+        try:
+            with open(os.path.join(src_dir, rel_path), "rb") as f:
+                data = f.read()
+        except OSError as e:
+            summary["failed"].append((rel_path, str(e)))
+            continue
+        digest = content_digest(data)
+        target = output_path(out_dir, rel_path)
+        if entry is not None and entry["hash"] == digest and not entry.get("error") and os.path.exists(target):
+            # Nur der Zeitstempel hat sich geändert (z. B. durch die Synchronisierung)
+            entry.update(mtime_ns=mtime_ns, size=size)
+            summary["unchanged"] += 1
+            continue
+        entry = {"mtime_ns": mtime_ns, "size": size, "hash": digest}
+        try:
+            results = convert_deck(data, target, formats, validate, options, seed)
+        except Exception as e:
+            # Fehlerhafte Decks erst nach der nächsten Änderung erneut versuchen
+            entry["error"] = str(e)
+            summary["failed"].append((rel_path, str(e)))
+        else:
+            summary["converted"].append(rel_path)
+            problems = {name: result for name, result in results.items() if result[1]}
+            if problems:
+                summary["problems"][rel_path] = problems
+        decks[rel_path] = entry
+
+    for rel_path in [rel_path for rel_path in decks if rel_path not in seen]:
+        changed = True
+        del decks[rel_path]
+        target = output_path(out_dir, rel_path)
+        if os.path.exists(target):
+            os.remove(target)
+        summary["removed"].append(rel_path)
+
+    if changed or not os.path.exists(index_path):
+        os.makedirs(out_dir, exist_ok=True)
+        save_index(index_path, decks, index_options)
+    return summary
+
+
+def print_summary(summary):
+    for rel_path in summary["converted"]:
+        print(f"Konvertiert: {rel_path}")
+    for rel_path in summary["removed"]:
+        print(f"Entfernt: {rel_path}")
+    for rel_path, error in summary["failed"]:
+        print(f"Fehler: {rel_path}: {error}")
+    for rel_path, problems in summary["problems"].items():
+        print(f"Formatprobleme in {rel_path}:")
+        print_results(problems)
+
+
+def watch(src_dir, out_dir, interval=2.0, **kwargs):
+    """Polls `src_dir` every `interval` seconds until interrupted; file system errors are reported per poll."""
+    print(f"Beobachte {src_dir} → {out_dir} (alle {interval:g} s, Abbruch mit Ctrl+C)")
+    try:
+        while True:
+            try:
+                print_summary(sync_folder(src_dir, out_dir, **kwargs))
+            except OSError as e:
+                # z. B. Ordner vorübergehend nicht erreichbar: beim nächsten Durchgang erneut versuchen
+                print(f"Fehler: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportiert ein Lernkarten-Deck in einem Durchgang in alle gewählten Formate.")
+    parser.add_argument("deck", help="Textdatei mit Lernkarten (durch Leerzeilen getrennt), mit --watch ein Ordner")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Ziel-ZIP-Datei (Standard: flashcards_outputs.zip), mit --watch der Zielordner")
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS),
+                        help=f"Kommagetrennte Formate aus: {', '.join(EXPORT_FORMATS)}")
+    parser.add_argument("--group-size", type=int, default=2)
+    parser.add_argument("--max-distractors", type=int, default=None,
+                        help="Höchstens so viele falsche Antworten pro Lücke in gruppierten Inlinechoice-Fragen")
+    parser.add_argument("--shuffle-choices", action="store_true",
+                        help="Antworten in gruppierten Inlinechoice-Fragen mischen (mit --seed reproduzierbar)")
+    parser.add_argument("--n-correct", type=int, default=4, help="Korrekte Zuordnungen pro Drag&drop-Frage")
+    parser.add_argument("--title", default="Lernkarteien", help="Titel der Drag&drop-Fragen")
+    parser.add_argument("--schedule", choices=("random", "balanced"), default="random")
+    parser.add_argument("--coverage", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--validate", action="store_true", help="Ausgaben vor dem Schreiben gegen das OLAT-Format prüfen")
+    parser.add_argument("--watch", action="store_true",
+                        help="Ordner beobachten und nur neue oder geänderte Decks konvertieren")
+    parser.add_argument("--once", action="store_true", help="Mit --watch: nur einmal abgleichen und beenden")
+    parser.add_argument("--interval", type=float, default=2.0, help="Mit --watch: Sekunden zwischen zwei Abgleichen")
+    args = parser.parse_args()
+
+    formats = [name.strip() for name in args.formats.split(",") if name.strip()]
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        sys.exit(f"Unbekannte Formate: {', '.join(sorted(unknown))}")
+    options = {
+        "group_size": args.group_size, "n_correct": args.n_correct, "title": args.title,
+        "schedule": args.schedule, "coverage": args.coverage, "max_distractors": args.max_distractors,
+        "shuffle_choices": args.shuffle_choices,
+    }
+
+    if args.watch:
+        if not os.path.isdir(args.deck):
+            sys.exit(f"{args.deck} ist kein Ordner.")
+        out_dir = args.output or os.path.join(args.deck, "olat_exports")
+        if args.once:
+            print_summary(sync_folder(args.deck, out_dir, formats, args.validate, args.seed, **options))
+        else:
+            watch(args.deck, out_dir, args.interval, formats=formats, validate=args.validate, seed=args.seed, **options)
+        sys.exit(0)
+
+    output = args.output or "flashcards_outputs.zip"
+    rng = random.Random(args.seed) if args.seed is not None else random
+    with open(output, "wb") as out:
+        names, results = export_file(args.deck, out, formats, args.validate, rng=rng, **options)
+    print(f"{len(names)} Dateien nach {output} geschrieben: {', '.join(names)}")
+    if args.validate and not print_results(results):
+        sys.exit(1)
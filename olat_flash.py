@@ -1,179 +1,13 @@
 import streamlit as st
-import re
-import random
 import json
-
-# Function Definitions
-def clean_back_text(back_text):
-    """Cleans specific characters from the back text."""
-    return re.sub(r"[📌🔍👉]", "", back_text).strip()
-
-def replace_ss_with_ss(text):
-    """Replaces 'ß' with 'ss'."""
-    return text.replace("ß", "ss")
-
-def parse_flashcards(text):
-    """Parses the input flashcards into structured data."""
-    blocks = text.strip().split('\n\n')
-    flashcards = []
-    max_back_lines = 0  # To track the maximum number of back lines
-
-    for block in blocks:
-        lines = [l.strip() for l in block.split('\n') if l.strip()]
-        if len(lines) < 2:
-            continue  # At least front and one back line
-        front = replace_ss_with_ss(lines[0])  # Replace ß with ss
-        backs = [replace_ss_with_ss(line) for line in lines[1:]]
-        clean_backs = [clean_back_text(back) for back in backs]
-        flashcards.append({
-            "front": front,
-            "clean_backs": clean_backs
-        })
-        if len(clean_backs) > max_back_lines:
-            max_back_lines = len(clean_backs)
-
-    return flashcards, max_back_lines
-
-def parse_flashcards_json(json_text):
-    """Parses flashcards from JSON input."""
-    flashcards = []
-    max_back_lines = 0
-
-    try:
-        data = json.loads(json_text)
-        if not isinstance(data, list):
-            st.error("Ungültiges JSON-Format: Das oberste Element muss eine Liste sein.")
-            return [], 0
-
-        for item in data:
-            if not isinstance(item, dict) or "question" not in item or "answer" not in item:
-                st.warning(f"Überspringe ungültigen Eintrag im JSON: {item}")
-                continue
-
-            front = replace_ss_with_ss(str(item["question"]))
-            answer_text = str(item["answer"])
-            # Split answer by newline, handle potential multiple newlines
-            backs = [replace_ss_with_ss(line.strip()) for line in answer_text.split('\n') if line.strip()]
-            clean_backs = [clean_back_text(back) for back in backs]
-
-            if not front or not clean_backs:
-                st.warning(f"Überspringe Eintrag wegen fehlender Vorder- oder Rückseite: {item}")
-                continue
-
-            flashcards.append({
-                "front": front,
-                "clean_backs": clean_backs
-            })
-            if len(clean_backs) > max_back_lines:
-                max_back_lines = len(clean_backs)
-
-    except json.JSONDecodeError:
-        st.error("Ungültiges JSON-Format. Bitte überprüfen Sie Ihre Eingabe.")
-        return [], 0
-    except Exception as e:
-        st.error(f"Ein Fehler ist beim Verarbeiten des JSON aufgetreten: {e}")
-        return [], 0
-
-    return flashcards, max_back_lines
-
-def check_uniform_back_lines(flashcards):
-    """Checks if all flashcards have the same number of back lines."""
-    if not flashcards:
-        return False, 0
-    first_len = len(flashcards[0]["clean_backs"])
-    for card in flashcards:
-        if len(card["clean_backs"]) != first_len:
-            return False, first_len
-    return True, first_len
-
-def generate_questions(flashcards, correct_line_index, title, n_correct):
-    """Generates question sets based on flashcards."""
-    questions = []
-    total_fronts = 8
-    if len(flashcards) < total_fronts:
-        return questions
-
-    for _ in range(len(flashcards)):  # Iterate enough times to generate multiple questions
-        # Select n_correct correct fronts
-        selected_correct_fronts = random.sample(flashcards, n_correct)
-        selected_correct_backs = []
-        for front in selected_correct_fronts:
-            try:
-                back = front["clean_backs"][correct_line_index]
-                selected_correct_backs.append(back)
-            except IndexError:
-                # Skip if any selected front does not have the required back line
-                selected_correct_backs = []
-                break
-
-        if len(selected_correct_backs) != n_correct:
-            continue  # Skip this iteration if backs are insufficient
-
-        # Select (total_fronts - n_correct) incorrect fronts
-        remaining_flashcards = [c for c in flashcards if c not in selected_correct_fronts]
-        if len(remaining_flashcards) < (total_fronts - n_correct):
-            continue  # Not enough incorrect fronts
-        selected_incorrect_fronts = random.sample(remaining_flashcards, total_fronts - n_correct)
-
-        # **Keine Shuffle der Backs**
-        shuffled_backs = selected_correct_backs.copy()
-
-        # Assign each correct front to one back using front text as key
-        front_to_back = dict(zip([c["front"] for c in selected_correct_fronts], shuffled_backs))
-
-        # Combine correct and incorrect fronts
-        all_fronts = selected_correct_fronts + selected_incorrect_fronts
-        random.shuffle(all_fronts)
-
-        # Prepare the question data
-        question_data = []
-        backs_header = [""] + shuffled_backs
-        num_columns = len(backs_header)
-
-        # Helper function to pad rows
-        def pad_row(row, total_cols):
-            return row + [""] * (total_cols - len(row))
-
-        # Add Typ, Title, Question, Points with padding
-        question_data.append(pad_row(["Typ", "Drag&drop"], num_columns))
-        question_data.append(pad_row(["Title", title], num_columns))
-        question_data.append(pad_row(
-            [ "Question", f"Ordnen Sie die Begriffe den korrekten Erklärungen zu. ❗ Achtung: Genau {n_correct} Begriffe können zugeordnet werden."],
-            num_columns
-        ))
-        question_data.append(pad_row(["Points", f"{0.5 * n_correct}"], num_columns))
-
-        # Add backs_header
-        question_data.append(backs_header)
-
-        # Add front cards with points
-        for front in all_fronts:
-            row = [front["front"]]
-            if front["front"] in front_to_back:
-                correct_back = front_to_back[front["front"]]
-                for back in shuffled_backs:
-                    if back == correct_back:
-                        row.append("0.5")
-                    else:
-                        row.append("-0.25")
-            else:
-                row.extend(["-0.25"] * n_correct)
-            row = pad_row(row, num_columns)
-            question_data.append(row)
-
-        questions.append(question_data)
-
-    return questions
-
-def format_questions(questions):
-    """Formats the questions for display or download."""
-    output_lines = []
-    for q_i, q_data in enumerate(questions, start=1):
-        if q_i > 1:
-            output_lines.append("")  # Separator between questions
-        for row in q_data:
-            output_lines.append("\t".join(row))
-    return "\n".join(output_lines)
+from olat_cache import content_digest
+from olat_core import check_uniform_back_lines, generate_line_output, coverage_stats
+from olat_jobs import job_key, submit_job
+from olat_shared import (
+    get_question_bank, get_worker_pool, cached_dragdrop_deck, cached_json_deck, cached_card_index, deck_text_area, follow_job,
+    show_job_outcome, show_validation,
+)
+from olat_validate import validate_outputs
 
 def get_copy_button_js(button_id, text):
     """Generates JavaScript code for copying text to clipboard."""
@@ -287,7 +121,7 @@ input_format = st.radio(
 )
 
 # Text Input
-input_text = st.text_area(f"Fügen Sie Ihre Flashcards im '{input_format}'-Format unten ein:", height=400)
+input_text = deck_text_area(f"Fügen Sie Ihre Flashcards im '{input_format}'-Format unten ein:", "flash", height=400)
 
 # Select number of correct pairs
 st.sidebar.header("Einstellungen für die Fragen")
@@ -300,7 +134,98 @@ n_correct = st.sidebar.slider(
     help="Wählen Sie, wie viele korrekte Paare in jeder Frage enthalten sein sollen. Die Gesamtanzahl der Optionen bleibt bei 8."
 )
 
+# Auswahl der korrekten Paare: zufällig oder ausgewogen (jede Karte gleich oft)
+schedule_label = st.sidebar.radio(
+    "Auswahl der korrekten Paare",
+    ("Zufällig", "Ausgewogen"),
+    help="'Ausgewogen' verteilt die Karten so, dass jede Karte gleich oft als korrektes Paar vorkommt – mit der minimalen Anzahl Fragen."
+)
+schedule = "balanced" if schedule_label == "Ausgewogen" else "random"
+coverage = st.sidebar.number_input(
+    "Wie oft soll jede Karte korrekt zugeordnet werden?", min_value=1, max_value=10, value=1, step=1
+) if schedule == "balanced" else 1
+
+# Zielgrösse: Generierung stoppt, sobald die Anzahl Fragen oder das Punktebudget erreicht ist (0 = unbegrenzt)
+max_questions = st.sidebar.number_input(
+    "Maximale Anzahl Fragen pro Zeile (0 = alle)", min_value=0, value=0, step=1
+) or None
+max_points = st.sidebar.number_input(
+    "Punktebudget pro Zeile (0 = unbegrenzt)", min_value=0.0, value=0.0, step=0.5,
+    help=f"Jede Frage zählt {0.5 * n_correct} Punkte."
+) or None
+
+# Optionale lokale Fragenbank: bereits generierte Fragen werden wiederverwendet
+use_bank = st.sidebar.checkbox("Fragenbank verwenden (Fragen lokal speichern und wiederverwenden)")
+seed = st.sidebar.number_input("Seed", min_value=0, value=0, step=1) if use_bank else 0
+
+def run_line_outputs(job, flashcards, card_index, selected_lines, question_title, n_correct, bank, seed, schedule,
+                     coverage, max_questions, max_points):
+    """Background job: generates the formatted output of each selected back line."""
+    outputs = {} # Dictionary to hold formatted output per selected line
+    stages = job.stages([f"Zeile {line_idx + 1}" for line_idx in selected_lines])
+    for line_idx, progress in zip(selected_lines, stages):
+        progress(0, 1)
+        formatted_output = generate_line_output(
+            flashcards, line_idx, question_title, n_correct, bank, seed, schedule, coverage,
+            max_questions, max_points, job.preview, progress, card_index
+        )
+        if formatted_output:
+            line_title = f"Zeile {line_idx + 1}" # Use 1-based index for display
+            outputs[line_title] = formatted_output
+        # else: No questions generated for this specific line (e.g., not enough cards), continue to next line
+    # Vor dem Download gegen das OLAT-Importformat prüfen
+    problems = validate_outputs(outputs)
+    return {
+        "outputs": outputs, "flashcards": flashcards, "question_title": question_title, "n_correct": n_correct,
+        "problems": problems,
+    }
+
+def render_outputs(outputs, flashcards, question_title, n_correct, problems):
+    """Displays the generated outputs side by side with copy and download buttons."""
+    # Check if any questions were generated across all selected lines
+    if not outputs:
+        st.error(f"Nicht genügend Flashcards ({len(flashcards)} gefunden), um Fragen zu generieren. Sie benötigen mindestens 8 Flashcards. Oder die Anzahl korrekter Paare ({n_correct}) ist für die verfügbaren Karten nicht möglich.")
+    else:
+        # JSON Output for debugging/inspection
+        with st.expander("Rohdaten der verarbeiteten Flashcards anzeigen"):
+            st.json([{"front": c["front"], "clean_backs": c["clean_backs"]} for c in flashcards]) # Show processed data
+
+        # Display outputs side by side in columns
+        num_columns = len(outputs)
+        if num_columns > 0:
+            cols = st.columns(num_columns)
+            output_items = sorted(outputs.items()) # Sort by line number ("Zeile 1", "Zeile 2", ...)
+
+            for idx, (line_title, formatted_output) in enumerate(output_items):
+                with cols[idx]:
+                    st.subheader(f"Output ({line_title})")
+                    text_area_key = f"text_area_{line_title.replace(' ', '_')}" # Unique key
+                    st.text_area(f"Formatierte Ausgabe - {line_title}", value=formatted_output, height=300, key=text_area_key)
+                    stats = coverage_stats(flashcards, formatted_output)
+                    st.caption(
+                        f"{stats['questions']} Fragen · jede Karte {stats['min']}–{stats['max']}× korrekt "
+                        f"(Ø {stats['mean']:.1f}) · {stats['uncovered']} Karten nie korrekt"
+                    )
+                    if line_title in problems:
+                        show_validation({line_title: problems[line_title]})
+
+                    # Copy Button
+                    copy_button_id = f"copy_btn_{line_title.replace(' ', '_')}"
+                    st.markdown(f'<button id="{copy_button_id}">Kopiere Text ({line_title})</button>', unsafe_allow_html=True)
+                    st.markdown(get_copy_button_js(copy_button_id, formatted_output), unsafe_allow_html=True)
+
+                    # Download Button
+                    download_filename = f"{question_title.lower().replace(' ', '_')}_{line_title.lower().replace(' ', '_')}_output.txt"
+                    st.download_button(
+                         label=f"Download ({line_title})",
+                         data=formatted_output,
+                         file_name=download_filename,
+                         mime="text/plain",
+                         key=f"download_btn_{line_title.replace(' ', '_')}" # Unique key
+                    )
+
 # Generate Button
+started_job = False
 if st.button("Generieren"):
     if not input_text.strip():
         st.error("Bitte fügen Sie die Flashcards-Daten ein.")
@@ -311,10 +236,12 @@ if st.button("Generieren"):
         # Parse input based on selected format
         try:
             if input_format == 'Plain Text':
-                flashcards, max_back_lines = parse_flashcards(input_text)
+                flashcards, max_back_lines = cached_dragdrop_deck(input_text)
             elif input_format == 'JSON':
                 # Error handling for invalid JSON is inside parse_flashcards_json
-                flashcards, max_back_lines = parse_flashcards_json(input_text)
+                flashcards, max_back_lines, messages = cached_json_deck(input_text)
+                for level, message in messages:
+                    getattr(st, level)(message)
 
         except Exception as e: # Catch potential unexpected errors during parsing call
              st.error(f"Ein unerwarteter Fehler beim Parsen der Eingabe ist aufgetreten: {e}")
@@ -326,6 +253,7 @@ if st.button("Generieren"):
             # Specific format errors are handled within the respective parsing functions.
             st.error("Keine gültigen Flashcards gefunden oder Parsing fehlgeschlagen. Überprüfen Sie das Format und den Inhalt Ihrer Eingabe.")
         else:
+            digest = content_digest(input_text)
             # Check if all flashcards have the same number of back lines
             is_uniform, back_line_count = check_uniform_back_lines(flashcards)
 
@@ -363,58 +291,20 @@ if st.button("Generieren"):
                 # Default title if not provided
                 question_title = custom_title if custom_title.strip() else "Lernkarteien"
 
-                # --- Generate and Display Outputs ---
-                all_questions_generated = False # Flag to check if any questions were generated at all
-                outputs = {} # Dictionary to hold formatted output per selected line
-
-                for line_idx in selected_lines:
-                    # Generate questions for the current line index
-                    questions_for_line = generate_questions(
-                        flashcards,
-                        correct_line_index=line_idx,
-                        title=question_title,
-                        n_correct=n_correct # Pass the selected number of correct pairs
-                    )
-
-                    if questions_for_line:
-                        all_questions_generated = True
-                        line_title = f"Zeile {line_idx + 1}" # Use 1-based index for display
-                        formatted_output = format_questions(questions_for_line)
-                        outputs[line_title] = formatted_output
-                    # else: No questions generated for this specific line (e.g., not enough cards), continue to next line
-
-
-                # Check if any questions were generated across all selected lines
-                if not all_questions_generated:
-                    st.error(f"Nicht genügend Flashcards ({len(flashcards)} gefunden), um Fragen zu generieren. Sie benötigen mindestens 8 Flashcards. Oder die Anzahl korrekter Paare ({n_correct}) ist für die verfügbaren Karten nicht möglich.")
-                else:
-                    # JSON Output for debugging/inspection
-                    with st.expander("Rohdaten der verarbeiteten Flashcards anzeigen"):
-                        st.json([{"front": c["front"], "clean_backs": c["clean_backs"]} for c in flashcards]) # Show processed data
-
-                    # Display outputs side by side in columns
-                    num_columns = len(outputs)
-                    if num_columns > 0:
-                        cols = st.columns(num_columns)
-                        output_items = sorted(outputs.items()) # Sort by line number ("Zeile 1", "Zeile 2", ...)
-
-                        for idx, (line_title, formatted_output) in enumerate(output_items):
-                            with cols[idx]:
-                                st.subheader(f"Output ({line_title})")
-                                text_area_key = f"text_area_{line_title.replace(' ', '_')}" # Unique key
-                                st.text_area(f"Formatierte Ausgabe - {line_title}", value=formatted_output, height=300, key=text_area_key)
-
-                                # Copy Button
-                                copy_button_id = f"copy_btn_{line_title.replace(' ', '_')}"
-                                st.markdown(f'<button id="{copy_button_id}">Kopiere Text ({line_title})</button>', unsafe_allow_html=True)
-                                st.markdown(get_copy_button_js(copy_button_id, formatted_output), unsafe_allow_html=True)
-
-                                # Download Button
-                                download_filename = f"{question_title.lower().replace(' ', '_')}_{line_title.lower().replace(' ', '_')}_output.txt"
-                                st.download_button(
-                                     label=f"Download ({line_title})",
-                                     data=formatted_output,
-                                     file_name=download_filename,
-                                     mime="text/plain",
-                                     key=f"download_btn_{line_title.replace(' ', '_')}" # Unique key
-                                )
\ No newline at end of file
+                # --- Generate in the background; an identical running request is not started again ---
+                submit_job(
+                    st.session_state, "flash_job", get_worker_pool(),
+                    job_key(input_format, digest, selected_lines, question_title, n_correct, use_bank, seed, schedule,
+                            coverage, max_questions, max_points),
+                    run_line_outputs, flashcards, cached_card_index(input_format, digest, flashcards),
+                    selected_lines, question_title, n_correct,
+                    get_question_bank() if use_bank else None, seed, schedule, coverage, max_questions, max_points,
+                )
+                started_job = True
+
+# Fortschritt anzeigen, solange ein Auftrag läuft (auch nach einem Klick auf "Abbrechen")
+job = st.session_state.get("flash_job")
+if job is not None and (started_job or not job.done):
+    follow_job(job, "flash_cancel")
+    if show_job_outcome(job):
+        render_outputs(**job.result)
@@ -0,0 +1,80 @@
+import codecs
+import os
+
+# Einlesen hochgeladener Dateien: schrittweise Dekodierung direkt aus dem Upload-Puffer,
+# ohne Kopien des ganzen Texts, mit Grössenlimit und Fallback für ältere Windows-Kodierungen.
+
+DEFAULT_MAX_UPLOAD_BYTES = int(os.environ.get("OLAT_MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+# Längere BOMs zuerst, da die UTF-32-LE-BOM mit der UTF-16-LE-BOM beginnt
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# Ohne BOM: UTF-8, sonst cp1252 (Windows-Editoren); latin-1 kann jedes Byte dekodieren
+FALLBACK_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
+
+class UploadTooLarge(ValueError):
+    """Raised before decoding when an upload exceeds the configured size limit."""
+
+
+def check_size(size, max_bytes=DEFAULT_MAX_UPLOAD_BYTES):
+    if size > max_bytes:
+        raise UploadTooLarge(f"Die Datei ist zu gross ({size} Bytes, maximal {max_bytes} Bytes).")
+
+
+def detect_bom(view):
+    """Returns (encoding, bom_length) for a byte order mark at the start of `view`, or (None, 0)."""
+    head = bytes(view[:4])
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    return None, 0
+
+
+def iter_decoded(view, encoding, chunk_size=CHUNK_SIZE):
+    """Decodes a memoryview chunk by chunk with an incremental decoder and yields the text chunks."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    for start in range(0, len(view), chunk_size):
+        text = decoder.decode(view[start:start + chunk_size])
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def ingest_bytes(data, parse, max_bytes=DEFAULT_MAX_UPLOAD_BYTES, chunk_size=CHUNK_SIZE):
+    """
+    Feeds the decoded text chunks of `data` (any bytes-like object) to parse(chunks) and
+    returns (parse result, encoding). The encoding of a BOM is tried first, then UTF-8;
+    if decoding fails the parser is restarted with cp1252 and finally latin-1.
+    """
+    view = memoryview(data).cast("B")
+    check_size(len(view), max_bytes)
+    encoding, offset = detect_bom(view)
+    candidates = [(candidate, 0) for candidate in FALLBACK_ENCODINGS]
+    if encoding == "utf-8":
+        # Eine UTF-8-BOM wird auch bei den Fallbacks übersprungen ("ï»¿" ist kein Kartentext)
+        candidates = [(candidate, offset) for candidate in FALLBACK_ENCODINGS]
+    elif encoding:
+        # Eine vermeintliche UTF-16/32-BOM kann auch Text sein, z. B. "ÿþ" in cp1252
+        candidates.insert(0, (encoding, offset))
+    for candidate, start in candidates[:-1]:
+        try:
+            return parse(iter_decoded(view[start:], candidate, chunk_size)), candidate
+        except UnicodeDecodeError:
+            continue
+    candidate, start = candidates[-1]
+    return parse(iter_decoded(view[start:], candidate, chunk_size)), candidate
+
+
+def decode_bytes(data, max_bytes=DEFAULT_MAX_UPLOAD_BYTES):
+    """Decodes `data` into one string with the same BOM handling and fallbacks; returns (text, encoding)."""
+    return ingest_bytes(data, "".join, max_bytes)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+
+# Hintergrund-Aufträge für die Streamlit-Seiten: Die Generierung läuft im gemeinsamen
+# Worker-Pool, das Skript fragt nur den Fortschritt ab und kann den Auftrag abbrechen.
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at the next progress checkpoint after cancel() was called."""
+
+
+class Job:
+    """State of one background generation, shared between the worker thread and the script."""
+
+    def __init__(self, key):
+        self.key = key
+        self.stage = "Warten auf freien Worker …"
+        self.fraction = 0.0
+        self.preview = []
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._state_lock = threading.Lock()
+        self._started = False
+
+    @property
+    def done(self):
+        return self._done_event.is_set()
+
+    def cancel(self):
+        """Requests cancellation; a job still waiting for a worker is finished right away."""
+        with self._state_lock:
+            self._cancel_event.set()
+            if not self._started:
+                self.cancelled = True
+                self._done_event.set()
+
+    def check(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled
+
+    def report(self, stage, done=0, total=1):
+        """Updates the progress and is the checkpoint where a cancelled job stops."""
+        self.check()
+        self.stage = stage
+        self.fraction = min(1.0, done / total) if total else 1.0
+
+    def stages(self, names):
+        """Splits the progress bar evenly and returns one progress(done, total) callback per stage."""
+        step = 1 / len(names)
+        return [self._stage_callback(name, i * step, (i + 1) * step) for i, name in enumerate(names)]
+
+    def _stage_callback(self, stage, start, end):
+        def progress(done, total):
+            self.check()
+            self.stage = stage
+            self.fraction = start + (end - start) * (min(1.0, done / total) if total else 1.0)
+        return progress
+
+    def wait(self, timeout=None):
+        return self._done_event.wait(timeout)
+
+    def _run(self, fn, args, kwargs):
+        with self._state_lock:
+            if self._done_event.is_set():
+                return  # vor dem Start abgebrochen
+            self._started = True
+        try:
+            self.check()
+            self.result = fn(self, *args, **kwargs)
+            self.fraction = 1.0
+        except JobCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done_event.set()
+
+
+def job_key(*parts):
+    """Content hash of the job inputs, used to recognize identical requests."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def submit_job(session_state, state_key, pool, key, fn, *args, **kwargs):
+    """
+    Starts fn(job, *args, **kwargs) in `pool` and stores the job under `state_key`.
+    An identical request that is still running is reused instead of started again;
+    a different running request of the same session is cancelled first.
+    """
+    current = session_state.get(state_key)
+    if current is not None and not current.done:
+        if current.key == key:
+            return current
+        current.cancel()
+    job = Job(key)
+    session_state[state_key] = job
+    pool.submit(job._run, fn, args, kwargs)
+    return job
@@ -0,0 +1,195 @@
+import argparse
+import math
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+# Lasttest für die Streamlit-Seiten: simuliert N gleichzeitige Sessions im selben Prozess, z. B.:
+#   python olat_loadtest.py --app olat_voci.py --sessions 1,5,10,30 --cards 200
+
+DECK_KEYS = {"olat_voci.py": "voci_deck_text", "olat_flash.py": "flash_deck_text"}
+
+
+def make_deck(num_cards, back_lines=3, seed=0):
+    """Builds a synthetic deck in the plain text format (front, back lines, blank line)."""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(num_cards):
+        lines = [f"Begriff {i} {rng.randrange(10**6)}"]
+        lines += [f"Erklärung {j + 1} zu Begriff {i}: {rng.randrange(10**6)}" for j in range(back_lines)]
+        cards.append("\n".join(lines))
+    return "\n\n".join(cards)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list; NaN for an empty list."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def current_rss_bytes():
+    """Current resident set size; falls back to the peak value where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler(threading.Thread):
+    """Samples the process RSS in the background and keeps the peak."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_bytes()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def timed_run(at, latencies):
+    started = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - started)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def checkbox_by_label(elements, label):
+    return next(cb for cb in elements if cb.label == label)
+
+
+# Jede Session liefert (Latenzen einfacher Reruns, Latenzen der Generierungs-Reruns, Downloads),
+# damit billige Reruns ohne Generierung die Perzentile der Generierung nicht verfälschen.
+
+def simulate_voci_session(app, deck, group_size, iterations, timeout):
+    """One classroom user on the Voci page: paste, choose types, generate, download."""
+    rerun_latencies = []
+    generate_latencies = []
+    downloads = 0
+    at = AppTest.from_file(app, default_timeout=timeout)
+    timed_run(at, rerun_latencies)
+    at.text_area(key=DECK_KEYS[app]).input(deck)
+    checkbox_by_label(at.checkbox, "Einzelne Fragen generieren").check()
+    checkbox_by_label(at.checkbox, "Gruppierte Fragen generieren").check()
+    timed_run(at, rerun_latencies)
+    for i in range(iterations):
+        # Gruppengröße variieren wie ein Mensch, der verschiedene Einstellungen ausprobiert
+        at.slider[0].set_value(min(10, group_size + i % 2))
+        at.button[0].click()
+        timed_run(at, generate_latencies)
+        downloads += len(at.get("download_button"))
+    return rerun_latencies, generate_latencies, downloads
+
+
+def simulate_flash_session(app, deck, group_size, iterations, timeout):
+    """One classroom user on the Drag&drop page: paste, then generate with a different "Zeile" selection each time."""
+    rerun_latencies = []
+    generate_latencies = []
+    downloads = 0
+    at = AppTest.from_file(app, default_timeout=timeout)
+    timed_run(at, rerun_latencies)
+    at.text_area(key=DECK_KEYS[app]).input(deck)
+    timed_run(at, rerun_latencies)
+    for i in range(iterations):
+        # Die "Zeile"-Checkboxen existieren nur im Generieren-Zweig: umschalten und im selben
+        # Rerun generieren, sonst verwirft Streamlit den Zustand und der Rerun bewirkt nichts
+        line_boxes = [cb for cb in at.sidebar.checkbox if cb.label.startswith("Zeile")]
+        if line_boxes:
+            box = line_boxes[i % len(line_boxes)]
+            # Mindestens eine Zeile bleibt ausgewählt
+            if not box.value or sum(cb.value for cb in line_boxes) > 1:
+                box.set_value(not box.value)
+        at.button[0].click()
+        timed_run(at, generate_latencies)
+        downloads += len(at.get("download_button"))
+    return rerun_latencies, generate_latencies, downloads
+
+
+SESSIONS = {"olat_voci.py": simulate_voci_session, "olat_flash.py": simulate_flash_session}
+
+
+def run_load(app, session_count, deck, group_size, iterations, timeout):
+    """Runs `session_count` concurrent sessions and returns the measured statistics."""
+    simulate = SESSIONS[app]
+    sampler = RssSampler()
+    baseline = current_rss_bytes()
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=session_count) as pool:
+        futures = [
+            pool.submit(simulate, app, deck, group_size, iterations, timeout)
+            for _ in range(session_count)
+        ]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+    peak = sampler.stop()
+
+    reruns = [latency for session_latencies, _, _ in results for latency in session_latencies]
+    generations = [latency for _, session_latencies, _ in results for latency in session_latencies]
+    return {
+        "sessions": session_count,
+        "generations": len(generations),
+        "reruns": len(reruns),
+        "downloads": sum(downloads for _, _, downloads in results),
+        "p50": percentile(generations, 50),
+        "p95": percentile(generations, 95),
+        "p99": percentile(generations, 99),
+        "rerun_p50": percentile(reruns, 50),
+        "rerun_p95": percentile(reruns, 95),
+        "wall": wall,
+        "peak_rss_mb": peak / 2**20,
+        "rss_per_session_mb": max(0, peak - baseline) / 2**20 / session_count,
+    }
+
+
+def print_report(rows):
+    """Prints one row per session count: percentiles of the generate reruns, then of the other reruns."""
+    header = (
+        f"{'Sessions':>8} {'Gen.':>5} {'Downl.':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+        f"{'Reruns':>7} {'R p50 s':>8} {'R p95 s':>8} {'Wall s':>8} {'Peak RSS MB':>12} {'MB/Session':>11}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['sessions']:>8} {row['generations']:>5} {row['downloads']:>7} {row['p50']:>8.3f} {row['p95']:>8.3f} "
+            f"{row['p99']:>8.3f} {row['reruns']:>7} {row['rerun_p50']:>8.3f} {row['rerun_p95']:>8.3f} "
+            f"{row['wall']:>8.2f} {row['peak_rss_mb']:>12.1f} {row['rss_per_session_mb']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lasttest mit gleichzeitigen Streamlit-Sessions (AppTest).")
+    parser.add_argument("--app", choices=sorted(SESSIONS), default="olat_voci.py")
+    parser.add_argument("--sessions", default="1,5,10", help="Kommagetrennte Anzahl gleichzeitiger Sessions")
+    parser.add_argument("--cards", type=int, default=100, help="Anzahl Lernkarten pro Deck")
+    parser.add_argument("--back-lines", type=int, default=3, help="Rückseitenzeilen pro Karte")
+    parser.add_argument("--group-size", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=3, help="Generierungen pro Session")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Zeitlimit pro Rerun in Sekunden")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    deck = make_deck(args.cards, args.back_lines)
+    rows = [
+        run_load(args.app, int(count), deck, args.group_size, args.iterations, args.timeout)
+        for count in args.sessions.split(",")
+    ]
+    print_report(rows)
@@ -0,0 +1,31 @@
+import streamlit as st
+
+from olat_shared import WORKER_COUNT, get_deck_cache
+
+# Betriebskennzahlen des gemeinsamen Deck-Caches (prozessweit, über alle Sessions)
+
+st.title("📊 Metriken")
+
+cache = get_deck_cache()
+stats = cache.stats()
+
+st.subheader("Cache der geparsten Decks")
+col1, col2, col3 = st.columns(3)
+col1.metric("Trefferquote", f"{stats['hit_rate']:.0%}", help=f"{stats['hits']} Treffer, {stats['misses']} Fehlzugriffe")
+col2.metric("Speicher", f"{stats['bytes'] / 2**20:.1f} MB", help=f"Maximal {stats['max_bytes'] / 2**20:.0f} MB")
+col3.metric("Einträge", stats["entries"])
+st.progress(min(1.0, stats["bytes"] / stats["max_bytes"]) if stats["max_bytes"] else 0.0)
+st.caption(
+    f"{stats['evictions']} Einträge wegen Platzmangel verdrängt (LRU) · "
+    f"{stats['expirations']} nach {stats['ttl']:.0f} s abgelaufen · {WORKER_COUNT} Worker"
+)
+
+if stats["kinds"]:
+    st.table([
+        {"Art": kind, "Einträge": count, "Speicher (KB)": round(size / 1024, 1)}
+        for kind, (count, size) in sorted(stats["kinds"].items())
+    ])
+
+if st.button("Cache leeren"):
+    cache.clear()
+    st.rerun()
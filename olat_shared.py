@@ -0,0 +1,120 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from olat_cache import DeckCache, content_digest
+from olat_core import (
+    split_blocks, iter_blocks, read_flashcards_blocks, parse_flashcards_blocks, parse_flashcards_json,
+    DistractorPool, CardIndex,
+)
+from olat_ingest import check_size, ingest_bytes
+from olat_store import QuestionBank
+from olat_validate import format_issues
+
+# Ressourcen, die sich alle Seiten (und alle Sessions) eines Streamlit-Prozesses teilen.
+
+SHARED_DECK_KEY = "shared_deck"
+WORKER_COUNT = int(os.environ.get("OLAT_WORKERS", min(4, os.cpu_count() or 1)))
+CANCEL_WAIT_SECONDS = 5.0
+
+@st.cache_resource
+def get_question_bank():
+    return QuestionBank()
+
+@st.cache_resource
+def get_worker_pool():
+    return ThreadPoolExecutor(max_workers=WORKER_COUNT, thread_name_prefix="olat-worker")
+
+@st.cache_resource
+def get_deck_cache():
+    return DeckCache()
+
+# Geparste Decks und Indizes hängen nur vom Inhalt ab, nie vom Seed: alle Sessions teilen sie.
+# Die Werte werden nicht kopiert und dürfen daher nicht verändert werden.
+
+def cached_deck_data(kind, digest, build):
+    """Seed-independent data derived from the deck with content hash `digest`, shared by all sessions."""
+    return get_deck_cache().get_or_compute((kind, digest), build)
+
+def cached_blocks(text):
+    """Splits a deck once; all converters derive their card view from these blocks."""
+    return cached_deck_data("blocks", content_digest(text), lambda: split_blocks(text))
+
+def cached_voci_deck(text):
+    return cached_deck_data("voci", content_digest(text), lambda: read_flashcards_blocks(cached_blocks(text)))
+
+def cached_dragdrop_deck(text):
+    return cached_deck_data("dragdrop", content_digest(text), lambda: parse_flashcards_blocks(cached_blocks(text)))
+
+def cached_json_deck(text):
+    def build():
+        messages = []
+        flashcards, max_back_lines = parse_flashcards_json(text, messages)
+        return flashcards, max_back_lines, messages
+    return cached_deck_data("json", content_digest(text), build)
+
+def cached_upload_blocks(uploaded_file):
+    """Decodes and splits an upload once per content; returns (content hash, blocks, encoding)."""
+    check_size(uploaded_file.size)
+    buffer = uploaded_file.getbuffer()
+    digest = content_digest(buffer)
+    blocks, encoding = cached_deck_data(
+        "upload", digest, lambda: ingest_bytes(buffer, lambda chunks: list(iter_blocks(chunks)))
+    )
+    return digest, blocks, encoding
+
+def cached_distractor_pool(digest, flashcards):
+    return cached_deck_data("distractor_pool", digest, lambda: DistractorPool(back for back, _ in flashcards))
+
+def cached_card_index(kind, digest, flashcards):
+    return cached_deck_data(f"card_index_{kind}", digest, lambda: CardIndex(flashcards))
+
+def deck_text_area(label, page_key, **kwargs):
+    """Text area whose content is shared between all pages of the multipage app."""
+    widget_key = f"{page_key}_deck_text"
+    # Streamlit entfernt Widget-Zustände beim Seitenwechsel, daher separat merken
+    if widget_key not in st.session_state:
+        st.session_state[widget_key] = st.session_state.get(SHARED_DECK_KEY, "")
+
+    def _remember():
+        st.session_state[SHARED_DECK_KEY] = st.session_state[widget_key]
+
+    return st.text_area(label, key=widget_key, on_change=_remember, **kwargs)
+
+def follow_job(job, cancel_key):
+    """Shows progress, preview and a cancel button until the background job has finished."""
+    if job.done:
+        return job
+    if st.button("Abbrechen", key=cancel_key):
+        job.cancel()
+        # Laufende Aufträge stoppen beim nächsten Fortschrittspunkt, wartende sofort
+        if not job.wait(CANCEL_WAIT_SECONDS):
+            st.warning("Abbruch angefordert, die Generierung wird beim nächsten Zwischenschritt beendet.")
+        return job
+    bar = st.progress(job.fraction, text=job.stage)
+    preview_box = st.empty()
+    while not job.wait(0.2):
+        bar.progress(job.fraction, text=job.stage)
+        if job.preview:
+            preview_box.code("\n\n".join(job.preview), language=None)
+    bar.empty()
+    preview_box.empty()
+    return job
+
+def show_job_outcome(job):
+    """Reports a cancelled or failed job; returns True if its result can be shown."""
+    if job.cancelled:
+        st.warning("Generierung abgebrochen.")
+        return False
+    if job.error is not None:
+        st.error(f"Bei der Generierung ist ein Fehler aufgetreten: {job.error}")
+        return False
+    return job.result is not None
+
+def show_validation(problems):
+    """Warns about generated files that do not match the OLAT import format."""
+    for file_name, issues in problems.items():
+        st.warning(f"{file_name}: {len(issues)} Problem(e) gefunden, OLAT könnte den Import ablehnen.")
+        with st.expander(f"Probleme in {file_name} anzeigen"):
+            st.text("\n".join(format_issues(issues)))
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Standardpfad der lokalen Fragenbank (überschreibbar per Umgebungsvariable)
+DEFAULT_BANK_PATH = os.environ.get("OLAT_BANK_PATH", "olat_bank.sqlite3")
+
+# SQLite begrenzt die Anzahl Parameter pro Statement
+LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    card_hash TEXT PRIMARY KEY,
+    content   TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS decks (
+    deck_hash TEXT PRIMARY KEY,
+    name      TEXT,
+    created   REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS deck_cards (
+    deck_hash TEXT NOT NULL,
+    position  INTEGER NOT NULL,
+    card_hash TEXT NOT NULL,
+    PRIMARY KEY (deck_hash, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS items (
+    kind      TEXT NOT NULL,
+    item_key  TEXT NOT NULL,
+    params    TEXT NOT NULL,
+    seed      INTEGER NOT NULL,
+    body      TEXT NOT NULL,
+    created   REAL NOT NULL,
+    PRIMARY KEY (kind, params, seed, item_key)
+) WITHOUT ROWID;
+"""
+
+
+def card_hash(*parts):
+    """Returns a stable content hash for a card (or any sequence of strings)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")  # Trenner, damit ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+def deck_hash(card_hashes):
+    """Returns the hash of a deck from the ordered hashes of its cards."""
+    return card_hash(*card_hashes)
+
+
+def params_key(params):
+    """Serializes generation parameters into a canonical lookup key."""
+    return json.dumps(params or {}, sort_keys=True, ensure_ascii=False)
+
+
+class QuestionBank:
+    """Embedded SQLite store for parsed decks and generated OLAT items."""
+
+    def __init__(self, path=DEFAULT_BANK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def save_deck(self, cards, name=None):
+        """Stores a deck (list of string tuples) and returns its deck hash."""
+        hashes = [card_hash(*card) for card in cards]
+        key = deck_hash(hashes)
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO cards (card_hash, content) VALUES (?, ?)",
+                ((h, json.dumps(list(card), ensure_ascii=False)) for h, card in zip(hashes, cards)),
+            )
+            self.conn.execute(
+                "INSERT OR IGNORE INTO decks (deck_hash, name, created) VALUES (?, ?, ?)",
+                (key, name, time.time()),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO deck_cards (deck_hash, position, card_hash) VALUES (?, ?, ?)",
+                ((key, pos, h) for pos, h in enumerate(hashes)),
+            )
+        return key
+
+    def load_deck(self, key):
+        """Loads a stored deck as a list of tuples, or None if it is unknown."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT c.content FROM deck_cards d JOIN cards c ON c.card_hash = d.card_hash "
+                "WHERE d.deck_hash = ? ORDER BY d.position",
+                (key,),
+            ).fetchall()
+        if not rows:
+            return None
+        return [tuple(json.loads(content)) for (content,) in rows]
+
+    def get_items(self, kind, keys, params=None, seed=0):
+        """Returns a dict item_key -> body for all stored items among `keys`."""
+        pkey = params_key(params)
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    "SELECT item_key, body FROM items WHERE kind = ? AND params = ? AND seed = ? "
+                    f"AND item_key IN ({placeholders})",
+                    (kind, pkey, seed, *chunk),
+                )
+                found.update(rows)
+        return found
+
+    def put_items(self, kind, items, params=None, seed=0):
+        """Bulk-inserts a dict item_key -> body in a single transaction."""
+        if not items:
+            return
+        pkey = params_key(params)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO items (kind, item_key, params, seed, body, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((kind, key, pkey, seed, body, now) for key, body in items.items()),
+            )
+
+    def export_items(self, kind=None):
+        """Yields (kind, item_key, params, seed, body) rows, optionally for one kind."""
+        query = "SELECT kind, item_key, params, seed, body FROM items"
+        args = ()
+        if kind is not None:
+            query += " WHERE kind = ?"
+            args = (kind,)
+        with self._lock:
+            rows = self.conn.execute(query, args).fetchall()
+        yield from rows
+
+    def count_items(self, kind=None):
+        """Returns the number of stored items, optionally for one kind."""
+        with self._lock:
+            if kind is None:
+                return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            return self.conn.execute("SELECT COUNT(*) FROM items WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def get_or_generate(bank, kind, keyed_inputs, generate, params=None, seed=0, progress=None, is_current=None):
+    """
+    Returns the bodies for `keyed_inputs` (list of (item_key, input)) in order.
+    Stored items are reused; only missing keys, and stored bodies for which
+    is_current(body, input) is false, are generated and then stored.
+    progress(done, total) is called before each input, if given.
+    """
+    stored = bank.get_items(kind, (key for key, _ in keyed_inputs), params, seed)
+    new_items = {}
+    bodies = []
+    total = len(keyed_inputs)
+    for done, (key, item_input) in enumerate(keyed_inputs):
+        if progress is not None:
+            progress(done, total)
+        body = new_items.get(key)
+        if body is None:
+            body = stored.get(key)
+            if body is not None and is_current is not None and not is_current(body, item_input):
+                body = None
+        if body is None:
+            body = new_items[key] = generate(key, item_input)
+        bodies.append(body)
+    bank.put_items(kind, new_items, params, seed)
+    if progress is not None:
+        progress(total, total)
+    return bodies, len(new_items)
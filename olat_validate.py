@@ -0,0 +1,273 @@
+import argparse
+import csv
+import io
+import sys
+import zipfile
+
+# Prüft generierte OLAT-Importdateien (Inlinechoice, FIB, Drag&drop) sowie die Quizlet-Exporte
+# in einem einzigen Durchgang Zeile für Zeile, bevor OLAT sie ablehnt, z. B.:
+#   python olat_validate.py inline_group.txt flashcards_outputs.zip
+
+MAX_REPORTED_ISSUES = 50  # pro Datei; gezählt wird trotzdem alles
+DRAGDROP_SCORES = ("0.5", "-0.25")
+
+
+def iter_records(lines):
+    """Groups lines into records separated by blank lines; yields (line number, rows of cells)."""
+    start = None
+    rows = []
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line:
+            if rows:
+                yield start, rows
+                rows = []
+            continue
+        if not rows:
+            start = line_no
+        rows.append(line.split("\t"))
+    if rows:
+        yield start, rows
+
+
+def parse_points(cell):
+    try:
+        return float(cell)
+    except ValueError:
+        return None
+
+
+def check_header(rows, names, issues, start):
+    """Checks the fixed "Name<TAB>value" rows at the top of a record; returns the number of rows checked."""
+    for offset, name in enumerate(names):
+        if offset >= len(rows):
+            issues.append((start, f"Zeile '{name}' fehlt."))
+            return len(rows)
+        cells = rows[offset]
+        if cells[0] != name:
+            issues.append((start + offset, f"'{name}' erwartet, gefunden: '{cells[0]}'."))
+        elif len(cells) != 2:
+            issues.append((start + offset, f"'{name}' hat {len(cells)} statt 2 Spalten (Tabulator im Text?)."))
+        elif not cells[1].strip():
+            issues.append((start + offset, f"'{name}' ist leer."))
+    return len(names)
+
+
+def check_points(points_cell, expected, issues, line_no, what):
+    points = parse_points(points_cell)
+    if points is None:
+        issues.append((line_no, f"Points '{points_cell}' ist keine Zahl."))
+    elif abs(points - expected) > 1e-9:
+        issues.append((line_no, f"Points {points_cell} passt nicht zu {what}."))
+
+
+def check_gap_record(rows, start, issues, title_rows, gap_width, check_gap):
+    """Shared grammar of Inlinechoice and FIB: header rows, then pairs of Text and gap rows."""
+    body = check_header(rows, title_rows, issues, start)
+    gaps = 0
+    for offset in range(body, len(rows)):
+        cells = rows[offset]
+        line_no = start + offset
+        if (offset - body) % 2 == 0:
+            if cells[0] != "Text":
+                issues.append((line_no, f"'Text' erwartet, gefunden: '{cells[0]}'."))
+            elif len(cells) != 2:
+                issues.append((line_no, f"'Text' hat {len(cells)} statt 2 Spalten (Tabulator im Kartentext?)."))
+            continue
+        gaps += 1
+        if len(cells) != gap_width:
+            issues.append((line_no, f"Lücke hat {len(cells)} statt {gap_width} Spalten (Tabulator im Kartentext?)."))
+            continue
+        check_gap(cells, line_no, issues)
+    if (len(rows) - body) % 2:
+        issues.append((start + len(rows) - 1, "'Text' ohne zugehörige Lücke."))
+    if gaps == 0:
+        issues.append((start, "Frage ohne Lücken."))
+    else:
+        points_offset = title_rows.index("Points")
+        if len(rows) > points_offset and len(rows[points_offset]) == 2:
+            check_points(rows[points_offset][1], gaps, issues, start + points_offset, f"{gaps} Lücke(n)")
+
+
+def check_inline_gap(cells, line_no, issues):
+    _, choices, answer, closing = cells
+    if not choices or not all(choice.strip() for choice in choices.split("|")):
+        issues.append((line_no, "Leere Auswahlliste oder leere Auswahl."))
+    if not answer.strip():
+        issues.append((line_no, "Leere richtige Antwort."))
+    if closing != "|":
+        issues.append((line_no, f"Letzte Spalte muss '|' sein, gefunden: '{closing}'."))
+
+
+def check_fib_gap(cells, line_no, issues):
+    _, answer, size = cells
+    if not answer.strip():
+        issues.append((line_no, "Leere richtige Antwort."))
+    if not size.isdigit():
+        issues.append((line_no, f"Lückengrösse '{size}' ist keine ganze Zahl."))
+
+
+def check_inlinechoice(rows, start, issues):
+    check_gap_record(rows[1:], start + 1, issues, ("Title", "Question", "Points"), 4, check_inline_gap)
+
+
+def check_fib(rows, start, issues):
+    check_gap_record(rows[1:], start + 1, issues, ("Title", "Points"), 3, check_fib_gap)
+
+
+def check_dragdrop(rows, start, issues):
+    width = len(rows[0])
+    for offset, cells in enumerate(rows):
+        if len(cells) != width:
+            issues.append((start + offset, f"{len(cells)} statt {width} Spalten (Tabulator im Kartentext?)."))
+    if width < 2:
+        issues.append((start, "Drag&drop-Frage ohne Spalten für Erklärungen."))
+        return
+    for offset, name in enumerate(("Title", "Question", "Points"), 1):
+        if offset >= len(rows):
+            issues.append((start, f"Zeile '{name}' fehlt."))
+            return
+        cells = rows[offset]
+        if cells[0] != name:
+            issues.append((start + offset, f"'{name}' erwartet, gefunden: '{cells[0]}'."))
+        elif not cells[1].strip() or any(cells[2:]):
+            issues.append((start + offset, f"'{name}' ist leer oder hat Text in den Füllspalten."))
+    if len(rows) < 6:
+        issues.append((start, "Kopfzeile mit Erklärungen oder Begriffe fehlen."))
+        return
+    header = rows[4]
+    if header[0] or not all(cell.strip() for cell in header[1:]):
+        issues.append((start + 4, "Kopfzeile muss mit einer leeren Zelle beginnen und nur nicht leere Erklärungen enthalten."))
+
+    correct = 0
+    column_hits = [0] * (width - 1)
+    for offset in range(5, len(rows)):
+        cells = rows[offset]
+        line_no = start + offset
+        if not cells[0].strip():
+            issues.append((line_no, "Begriff ist leer."))
+        scores = cells[1:width]
+        if not all(score in DRAGDROP_SCORES for score in scores):
+            issues.append((line_no, f"Bewertungen müssen {' oder '.join(DRAGDROP_SCORES)} sein."))
+            continue
+        hits = [i for i, score in enumerate(scores) if score == "0.5"]
+        if len(hits) > 1:
+            issues.append((line_no, "Begriff ist mehreren Erklärungen zugeordnet."))
+        for i in hits:
+            column_hits[i] += 1
+        correct += len(hits)
+    for i, hits in enumerate(column_hits):
+        if hits != 1:
+            issues.append((start + 4, f"Erklärung in Spalte {i + 2} hat {hits} statt genau einer richtigen Zuordnung."))
+    if len(rows[3]) >= 2:
+        check_points(rows[3][1], 0.5 * correct, issues, start + 3, f"{correct} richtigen Zuordnungen")
+
+
+RECORD_TYPES = {
+    ("Type", "Inlinechoice"): check_inlinechoice,
+    ("Type", "FIB"): check_fib,
+    ("Typ", "Drag&drop"): check_dragdrop,
+}
+
+
+def validate_olat_lines(lines):
+    """Checks all records of an OLAT import file; returns (number of records, issues)."""
+    issues = []
+    records = 0
+    for start, rows in iter_records(lines):
+        records += 1
+        check = RECORD_TYPES.get(tuple(rows[0][:2]))
+        if check is None:
+            issues.append((start, f"Unbekannter Fragetyp: '{' '.join(rows[0][:2])}'."))
+            continue
+        check(rows, start, issues)
+    return records, issues
+
+
+def validate_quizlet_rows(rows):
+    """Checks that every row of a Quizlet export has a non-empty term and definition."""
+    issues = []
+    records = 0
+    for line_no, row in enumerate(rows, 1):
+        records += 1
+        if len(row) != 2:
+            issues.append((line_no, f"{len(row)} statt 2 Spalten."))
+        elif not row[0].strip() or not row[1].strip():
+            issues.append((line_no, "Begriff oder Definition ist leer."))
+    return records, issues
+
+
+def validate_stream(file_name, text_stream):
+    """Validates one output file read line by line from `text_stream`; the grammar is chosen by file name."""
+    if file_name.endswith(".tsv"):
+        return validate_quizlet_rows(line.rstrip("\r\n").split("\t") for line in text_stream)
+    if file_name.endswith(".csv"):
+        return validate_quizlet_rows(csv.reader(text_stream))
+    return validate_olat_lines(text_stream)
+
+
+def validate_output(file_name, content):
+    """Validates a generated output given as str or UTF-8 bytes; returns (number of records, issues)."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        stream = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8", newline="")
+    else:
+        stream = io.StringIO(content, newline="")
+    return validate_stream(file_name, stream)
+
+
+def validate_outputs(outputs):
+    """Validates a dict file name -> content; returns file name -> issues for the files with problems."""
+    problems = {}
+    for file_name, content in outputs.items():
+        _, issues = validate_output(file_name, content)
+        if issues:
+            problems[file_name] = issues
+    return problems
+
+
+def format_issues(issues, limit=MAX_REPORTED_ISSUES):
+    """Human-readable lines for the first `limit` issues."""
+    lines = [f"Zeile {line_no}: {message}" for line_no, message in issues[:limit]]
+    if len(issues) > limit:
+        lines.append(f"… und {len(issues) - limit} weitere Probleme.")
+    return lines
+
+
+def validate_path(path):
+    """Validates a single output file or every entry of a ZIP archive; returns file name -> (records, issues)."""
+    results = {}
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                with zf.open(name) as raw:
+                    results[f"{path}:{name}"] = validate_stream(
+                        name, io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                    )
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            results[str(path)] = validate_stream(str(path), f)
+    return results
+
+
+def print_results(results, out=sys.stdout):
+    """Prints a report per file and returns True if no problems were found."""
+    ok = True
+    for file_name, (records, issues) in results.items():
+        if issues:
+            ok = False
+            print(f"{file_name}: {records} Einträge, {len(issues)} Probleme", file=out)
+            for line in format_issues(issues):
+                print(f"  {line}", file=out)
+        else:
+            print(f"{file_name}: {records} Einträge, OK", file=out)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prüft generierte OLAT-Importdateien (auch ZIP-Archive).")
+    parser.add_argument("paths", nargs="+", help="Textdateien oder ZIP-Archive")
+    args = parser.parse_args()
+    results = {}
+    for path in args.paths:
+        results.update(validate_path(path))
+    sys.exit(0 if print_results(results) else 1)
@@ -1,8 +1,20 @@
 import streamlit as st
 import random
-import math
-from io import StringIO, BytesIO
+from io import BytesIO
 import zipfile
+from olat_core import (
+    generate_inline_single, generate_fib_single, create_groups, generate_inline_group, generate_fib_group,
+    generate_single_from_bank, create_groups_from_bank, report_progress, read_flashcards_blocks,
+)
+from olat_export import EXPORT_FORMATS, FORMAT_LABELS, export_deck, write_zip
+from olat_cache import content_digest
+from olat_ingest import UploadTooLarge
+from olat_jobs import job_key, submit_job
+from olat_shared import (
+    get_question_bank, get_worker_pool, cached_blocks, cached_voci_deck, cached_upload_blocks, cached_deck_data,
+    cached_distractor_pool, deck_text_area, follow_job, show_job_outcome, show_validation,
+)
+from olat_validate import validate_outputs
 
 # Seiten-Titel mit Emojis
 st.title("🎓 OLAT Voci-Lernkarteien Converter 📚")
@@ -26,97 +38,6 @@ st.sidebar.markdown("""
 > - **Intergruppierte Formate**: Karten werden in Gruppen verarbeitet, was eine zusammenhängende Bearbeitung ermöglicht.
 """)
 
-def read_flashcards(content):
-    flashcards = []
-    raw_flashcards = [fc.strip() for fc in content.split('\n\n') if fc.strip()]
-    for fc in raw_flashcards:
-        lines = fc.split('\n')
-        if len(lines) >= 2:
-            back = lines[0].strip()
-            front = lines[1].strip()
-            flashcards.append((back, front))
-    return flashcards
-
-def generate_inline_single(flashcards):
-    output = ""
-    for back, front in flashcards:
-        choices = [card[0] for card in flashcards if card[0] != back]
-        if len(choices) > 3:
-            choices = random.sample(choices, 3)
-        choices_str = "|".join(choices)
-        output += "Type\tInlinechoice\n"
-        output += "Title\tWörter einordnen\n"
-        output += "Question\t✏✏Wählen Sie die richtigen Begriffe.✏✏\n"
-        output += "Points\t1\n"
-        output += f"Text\t{front} = \n"
-        output += f"1\t{choices_str}\t{back}\t|\n\n"
-    return output
-
-def generate_fib_single(flashcards):
-    output = ""
-    for back, front in flashcards:
-        output += "Type\tFIB\n"
-        output += "Title\t✏✏Vervollständigen Sie die Lücken mit dem korrekten Begriff.✏✏\n"
-        output += "Points\t1\n"
-        output += f"Text\t{front} = \n"
-        output += f"1\t{back}\t20\n\n"
-    return output
-
-def create_groups(flashcards, group_size):
-    required_appearances = 2
-    assignments = flashcards * required_appearances
-    random.shuffle(assignments)
-    total_assignments = len(assignments)
-    num_groups = math.ceil(total_assignments / group_size)
-    groups = [[] for _ in range(num_groups)]
-    
-    for card in flashcards:
-        assigned = 0
-        while assigned < required_appearances:
-            group_index = random.randint(0, num_groups - 1)
-            if card not in groups[group_index] and len(groups[group_index]) < group_size:
-                groups[group_index].append(card)
-                assigned += 1
-    
-    for i in range(num_groups):
-        while len(groups[i]) < group_size:
-            available_flashcards = [card for card in flashcards if card not in groups[i]]
-            if not available_flashcards:
-                available_flashcards = flashcards
-            groups[i].append(random.choice(available_flashcards))
-    for group in groups:
-        random.shuffle(group)
-    
-    return groups
-
-def generate_inline_group(groups, group_size):
-    output = ""
-    for group in groups:
-        output += "Type\tInlinechoice\n"
-        output += "Title\tWörter einordnen\n"
-        output += "Question\t✏✏Wählen Sie die richtigen Begriffe.✏✏\n"
-        output += f"Points\t{group_size}\n"
-        for _, (back, front) in enumerate(group, 1):
-            distractors = [card[0] for card in group if card[0] != back]
-            distractors = list(set(distractors))
-            choices_str = "|".join(distractors)
-            output += f"Text\t  // {front} = \n"
-            output += f"1\t{choices_str}\t{back}\t|\n"
-        output += "\n"
-    return output
-
-def generate_fib_group(groups, group_size):
-    output = ""
-    for group in groups:
-        output += "Type\tFIB\n"
-        output += "Title\t✏✏Vervollständigen Sie die Lücken mit dem korrekten Begriff.✏✏\n"
-        output += f"Points\t{group_size}\n"
-        for back, front in group:
-            output += f"Text\t  // {front} = \n"
-            output += f"1\t{back}\t20\n"
-        output += "\n"
-    return output
-
 # Dropdown für den Prompt
 with st.expander("📄 Prompt für die Generierung von Lernkarten anzeigen"):
     st.code("""
@@ -165,61 +86,173 @@ with st.expander("📄 Prompt für die Generierung von Lernkarten anzeigen"):
 
 # Dateiupload und Textbereich für Eingaben
 uploaded_file = st.file_uploader("Lade eine .txt-Datei mit Lernkarten hoch. Trenne die Lernkarten mit einer Leerzeile. Verwende dieses [Custom-GPT](https://chatgpt.com/g/g-675ea28843a4819188dc512c1966a152-lernkarteien) zur Generierung von Vokabel-Lernkarten.", type=["txt"])
-text_input = st.text_area("Oder füge deine Lernkarten hier ein. Trenne die Lernkarten mit einer Leerzeile. Verwende dieses [Custom-GPT](https://chatgpt.com/g/g-675ea28843a4819188dc512c1966a152-lernkarteien) zur Generierung von Vokabel-Lernkarten.", height=200)
+text_input = deck_text_area("Oder füge deine Lernkarten hier ein. Trenne die Lernkarten mit einer Leerzeile. Verwende dieses [Custom-GPT](https://chatgpt.com/g/g-675ea28843a4819188dc512c1966a152-lernkarteien) zur Generierung von Vokabel-Lernkarten.", "voci", height=200)
 
 # Checkboxen für Fragetypen
 generate_single = st.checkbox("Einzelne Fragen generieren")
 generate_group = st.checkbox("Gruppierte Fragen generieren")
 
+# Export-Modus: das Deck wird einmal geparst und alle gewählten Formate in einem Durchgang erzeugt
+export_mode = st.checkbox("Alle Formate in einem Durchgang exportieren (inkl. Drag&drop und Quizlet)")
+export_formats = st.multiselect(
+    "Formate für den Export", EXPORT_FORMATS, default=list(EXPORT_FORMATS), format_func=FORMAT_LABELS.get
+) if export_mode else []
+
 # Slider für Gruppengröße (nur sichtbar, wenn gruppierte Fragen ausgewählt sind)
-group_size = st.slider("Wähle die Gruppengröße", min_value=2, max_value=10, value=2) if generate_group else None
+needs_groups = generate_group or "inline_group" in export_formats or "fib_group" in export_formats
+group_size = st.slider("Wähle die Gruppengröße", min_value=2, max_value=30, value=2) if needs_groups else None
+# Bei grossen Gruppen die Auswahlliste pro Lücke begrenzen (0 = alle anderen Antworten der Gruppe)
+max_distractors = st.number_input(
+    "Maximale Anzahl falscher Antworten pro Lücke (0 = alle)", min_value=0, value=0, step=1
+) if needs_groups else 0
+shuffle_choices = st.checkbox("Antworten in gruppierten Fragen mischen") if needs_groups else False
+n_correct = st.slider(
+    "Anzahl der korrekten Paare pro Drag&drop-Frage", min_value=1, max_value=6, value=4
+) if "dragdrop" in export_formats else 4
+
+# Optionale lokale Fragenbank: bereits generierte Fragen werden wiederverwendet (nicht im Export-Modus)
+use_bank = False if export_mode else st.checkbox("Fragenbank verwenden (Fragen lokal speichern und wiederverwenden)")
+seed = st.number_input("Seed", min_value=0, value=0, step=1) if use_bank else 0
+
+def run_generation(job, flashcards, pool, generate_single, generate_group, group_size, max_distractors,
+                   shuffle_choices, bank, seed):
+    """Background job: generates all selected outputs and the ZIP archive."""
+    notes = []
+    # Ergebnisse in einem Wörterbuch speichern
+    outputs = {}
+
+    stage_names = []
+    if generate_single:
+        stage_names += ["Einzelne Fragen: Inlinechoice", "Einzelne Fragen: FIB"]
+    if generate_group:
+        stage_names += ["Gruppierte Fragen: Inlinechoice", "Gruppierte Fragen: FIB"]
+    stage_names.append("ZIP-Datei erstellen")
+    stages = iter(job.stages(stage_names))
+
+    if bank is not None:
+        deck_key = bank.save_deck(flashcards)
+
+    if generate_single:
+        if bank is not None:
+            inline_single, fib_single, new_cards = generate_single_from_bank(bank, flashcards, seed, pool, next(stages))
+            next(stages)(1, 1)
+            notes.append(f"{len(flashcards) - new_cards} Lernkarten aus der Fragenbank wiederverwendet, {new_cards} neu generiert.")
+            outputs["inline_single.txt"] = inline_single
+            outputs["fib_single.txt"] = fib_single
+        else:
+            outputs["inline_single.txt"] = generate_inline_single(flashcards, next(stages), pool)
+            outputs["fib_single.txt"] = generate_fib_single(flashcards, next(stages))
+
+    if generate_group:
+        progress = next(stages)
+        progress(0, 1)
+        if bank is not None:
+            groups = create_groups_from_bank(bank, deck_key, flashcards, group_size, seed)
+        else:
+            groups = create_groups(flashcards, group_size)
+        # Mit Fragenbank ist auch die Reihenfolge der Antworten durch den Seed festgelegt
+        rng = random.Random(f"{seed}:inline_group") if bank is not None else random
+        outputs["inline_group.txt"] = generate_inline_group(
+            groups, group_size, progress, max_distractors or None, shuffle_choices, rng
+        )
+        outputs["fib_group.txt"] = generate_fib_group(groups, group_size, next(stages))
+
+    # Vor dem Download gegen das OLAT-Importformat prüfen
+    problems = validate_outputs(outputs)
 
+    # Zip-Datei für den Massen-Download erstellen
+    progress = next(stages)
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zf:
+        for file_name, content in report_progress(list(outputs.items()), progress):
+            zf.writestr(file_name, content)
+    return {"outputs": outputs, "zip": zip_buffer.getvalue(), "notes": notes, "problems": problems}
+
+def run_export(job, blocks, export_formats, group_size, max_distractors, shuffle_choices, n_correct):
+    """Background job: writes all export formats in one pass and packs them into the ZIP archive."""
+    export_progress, zip_progress = job.stages(["Export aller Formate", "ZIP-Datei erstellen"])
+    files = export_deck(
+        blocks, export_formats, group_size=group_size or 2, n_correct=n_correct, max_distractors=max_distractors or None,
+        shuffle_choices=shuffle_choices, progress=export_progress,
+    )
+    zip_progress(0, 1)
+    zip_buffer = BytesIO()
+    write_zip(files, zip_buffer)
+    outputs = {file_name: sink.getvalue() for file_name, sink in files.items()}
+    for sink in files.values():
+        sink.close()
+    problems = validate_outputs(outputs)
+    zip_progress(1, 1)
+    return {"outputs": outputs, "zip": zip_buffer.getvalue(), "notes": [], "problems": problems}
+
+started_job = False
 if st.button("Lernkarten generieren"):
-    if uploaded_file or text_input:
+    if export_mode and not export_formats:
+        st.warning("Bitte wähle mindestens ein Format für den Export.")
+    elif uploaded_file or text_input:
+        flashcards = []
         if uploaded_file:
-            content = StringIO(uploaded_file.getvalue().decode("utf-8")).read()
+            # Dekodierte Kartenblöcke werden pro Dateiinhalt für alle Sessions zwischengespeichert
+            try:
+                digest, blocks, encoding = cached_upload_blocks(uploaded_file)
+                flashcards = cached_deck_data("voci", digest, lambda: read_flashcards_blocks(blocks))
+                if encoding != "utf-8":
+                    st.info(f"Die Datei wurde mit der Kodierung {encoding} gelesen.")
+            except UploadTooLarge as e:
+                st.error(str(e))
+            except ValueError as e:
+                # z. B. UnicodeDecodeError aus dem Parser
+                st.error(f"Die Datei konnte nicht gelesen werden: {e}")
         else:
-            content = text_input
-        
-        flashcards = read_flashcards(content)
+            digest = content_digest(text_input)
+            blocks = cached_blocks(text_input)
+            flashcards = cached_voci_deck(text_input)
+
         if flashcards:
             st.success(f"{len(flashcards)} Lernkarten erfolgreich geladen.")
-            
-            # Ergebnisse in einem Wörterbuch speichern
-            outputs = {}
-
-            if generate_single:
-                outputs["inline_single.txt"] = generate_inline_single(flashcards)
-                outputs["fib_single.txt"] = generate_fib_single(flashcards)
-
-            if generate_group:
-                groups = create_groups(flashcards, group_size)
-                outputs["inline_group.txt"] = generate_inline_group(groups, group_size)
-                outputs["fib_group.txt"] = generate_fib_group(groups, group_size)
-
-            # Individuelle Download-Buttons für jede Datei anzeigen
-            for file_name, content in outputs.items():
-                st.download_button(
-                    label=f"{file_name} herunterladen",
-                    data=content,
-                    file_name=file_name,
-                    mime="text/plain"
+            # Generierung im Hintergrund; ein identischer, noch laufender Auftrag wird nicht neu gestartet
+            if export_mode:
+                submit_job(
+                    st.session_state, "voci_job", get_worker_pool(),
+                    job_key(digest, export_formats, group_size, max_distractors, shuffle_choices, n_correct),
+                    run_export, blocks, export_formats, group_size, max_distractors, shuffle_choices, n_correct,
                 )
-
-            # Zip-Datei für den Massen-Download erstellen
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w") as zf:
-                for file_name, content in outputs.items():
-                    zf.writestr(file_name, content)
-            zip_buffer.seek(0)
-
-            st.download_button(
-                label="Alle Dateien als ZIP herunterladen",
-                data=zip_buffer,
-                file_name="flashcards_outputs.zip",
-                mime="application/zip"
-            )
+            else:
+                submit_job(
+                    st.session_state, "voci_job", get_worker_pool(),
+                    job_key(digest, generate_single, generate_group, group_size, max_distractors, shuffle_choices,
+                            use_bank, seed),
+                    run_generation, flashcards, cached_distractor_pool(digest, flashcards),
+                    generate_single, generate_group, group_size, max_distractors, shuffle_choices,
+                    get_question_bank() if use_bank else None, seed,
+                )
+            started_job = True
         else:
             st.warning("Keine gültigen Lernkarten gefunden. Bitte überprüfe das Eingabeformat.")
     else:
         st.warning("Bitte lade eine Datei hoch oder füge Lernkarten ein.")
+
+# Fortschritt anzeigen, solange ein Auftrag läuft (auch nach einem Klick auf "Abbrechen")
+job = st.session_state.get("voci_job")
+if job is not None and (started_job or not job.done):
+    follow_job(job, "voci_cancel")
+    if show_job_outcome(job):
+        for note in job.result["notes"]:
+            st.info(note)
+        show_validation(job.result["problems"])
+
+        # Individuelle Download-Buttons für jede Datei anzeigen
+        for file_name, content in job.result["outputs"].items():
+            st.download_button(
+                label=f"{file_name} herunterladen",
+                data=content,
+                file_name=file_name,
+                mime="text/plain"
+            )
+
+        st.download_button(
+            label="Alle Dateien als ZIP herunterladen",
+            data=job.result["zip"],
+            file_name="flashcards_outputs.zip",
+            mime="application/zip"
+        )
@@ -0,0 +1,155 @@
+import http.client
+import multiprocessing
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import olat_api
+from olat_api import ConversionHandler, ConversionService, parse_params, run_job
+
+DECK = "Haus\nhouse\n\nHund\ndog\n\nKatze\ncat\n\nBaum\ntree"
+
+
+def fake_run_job(kind, text, params):
+    if kind == "slow":
+        time.sleep(30)
+    if kind == "crash":
+        os._exit(3)
+    if kind == "error":
+        raise ValueError("kaputt")
+    return {"out.txt": text}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # Mit "fork" sieht der Worker-Prozess die ersetzte run_job-Funktion
+    monkeypatch.setattr(olat_api, "run_job", fake_run_job)
+    service = ConversionService(2, 0, timeout=1.0, context=multiprocessing.get_context("fork"))
+    yield service
+    service.shutdown()
+
+
+def test_timeout_only_stops_its_own_job(service):
+    results = {}
+
+    def slow():
+        try:
+            service.submit("slow", "", {})
+        except TimeoutError:
+            results["slow"] = "timeout"
+
+    thread = threading.Thread(target=slow)
+    thread.start()
+    time.sleep(0.2)
+    results["fast"] = service.submit("fast", "x", {})
+    thread.join()
+    assert results == {"slow": "timeout", "fast": {"out.txt": "x"}}
+    # Der Dienst bleibt nach dem Zeitlimit nutzbar
+    assert service.submit("fast", "y", {}) == {"out.txt": "y"}
+    assert service.metrics.counters["timeouts"] == 1
+
+
+def test_crashed_or_failing_worker_is_reported(service):
+    with pytest.raises(RuntimeError, match="Exitcode 3"):
+        service.submit("crash", "", {})
+    with pytest.raises(RuntimeError, match="kaputt"):
+        service.submit("error", "", {})
+    assert service.submit("fast", "z", {}) == {"out.txt": "z"}
+
+
+def test_full_queue_is_rejected(service):
+    service.slots = threading.BoundedSemaphore(1)
+    service.slots.acquire()
+    with pytest.raises(OverflowError):
+        service.submit("fast", "", {})
+    assert service.metrics.counters["rejected"] == 1
+
+
+def test_run_job_voci_single():
+    outputs = run_job("voci/single", DECK, {"seed": 1})
+    assert set(outputs) == {"inline_single.txt", "fib_single.txt"}
+    assert outputs["fib_single.txt"].count("Type\tFIB") == 4
+
+
+def test_run_job_without_cards_returns_nothing():
+    assert run_job("voci/single", "", {"seed": None}) == {}
+    assert run_job("voci/group", "nur eine Zeile", {"seed": None, "group_size": 2}) == {}
+
+
+def test_run_job_seed_does_not_touch_global_random():
+    params = {"seed": 7, "group_size": 2, "max_distractors": None, "shuffle": True}
+    random.seed(123)
+    expected = random.random()
+    random.seed(123)
+    first = run_job("voci/group", DECK, params)
+    assert random.random() == expected
+    assert run_job("voci/group", DECK, params) == first
+
+
+@pytest.mark.parametrize("query", [
+    {"max_questions": ["-1"]},
+    {"max_points": ["-2"]},
+    {"max_points": ["nan"]},
+    {"max_points": ["inf"]},
+    {"coverage": ["0"]},
+    {"schedule": ["balanced"], "coverage": ["100000000"]},
+])
+def test_parse_params_rejects_out_of_range_limits(query):
+    with pytest.raises(ValueError):
+        parse_params("dragdrop", query)
+
+
+def test_parse_params_zero_limits_mean_unlimited():
+    params = parse_params("dragdrop", {"max_questions": ["0"], "max_points": ["0"], "coverage": ["10"]})
+    assert params["max_questions"] is None and params["max_points"] is None and params["coverage"] == 10
+
+
+def test_parse_params_rejects_line_zero():
+    assert parse_params("dragdrop", {"lines": ["1,3"]})["lines"] == [0, 2]
+    with pytest.raises(ValueError):
+        parse_params("dragdrop", {"lines": ["0"]})
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (ConversionHandler,), {"service": ConversionService(1, 0, timeout=10.0)})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path, body=b"", headers=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    conn.putrequest("POST", path, skip_accept_encoding=True)
+    for name, value in (headers or {"Content-Length": str(len(body))}).items():
+        conn.putheader(name, value)
+    conn.endheaders(body)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+@pytest.mark.parametrize("length", ["-1", "abc"])
+def test_invalid_content_length_is_rejected(server, length):
+    response = post(server, "/voci/single", headers={"Content-Length": length})
+    assert response.status == 400
+    assert response.getheader("Connection") == "close"
+
+
+def test_unread_bodies_close_the_connection(server):
+    response = post(server, "/unbekannt", b"Haus\nhouse")
+    assert response.status == 404 and response.getheader("Connection") == "close"
+    response = post(server, "/voci/single", headers={"Content-Length": str(olat_api.MAX_BODY_BYTES + 1)})
+    assert response.status == 413 and response.getheader("Connection") == "close"
+
+
+def test_empty_deck_is_unprocessable(server):
+    assert post(server, "/voci/single", "kein Deck".encode("utf-8")).status == 422
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+
+import pytest
+
+from olat_cache import DeckCache, content_digest, estimate_size
+from olat_core import CardIndex, DistractorPool, format_line_output, generate_inline_single
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_by_bytes():
+    cache = DeckCache(max_bytes=300)
+    cache.put("a", "x", size=100)
+    cache.put("b", "y", size=100)
+    cache.put("c", "z", size=100)
+    assert cache.get("a") == (True, "x")  # "a" ist nun zuletzt benutzt
+    cache.put("d", "w", size=150)
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (False, None)
+    assert cache.get("a") == (True, "x")
+    stats = cache.stats()
+    assert stats["bytes"] == 250 and stats["entries"] == 2 and stats["evictions"] == 2
+
+
+def test_too_large_values_are_not_stored():
+    cache = DeckCache(max_bytes=100)
+    cache.put("small", 1, size=50)
+    cache.put("huge", 2, size=101)
+    assert cache.get("huge") == (False, None)
+    assert cache.get("small") == (True, 1)
+
+
+def test_ttl_expires_entries():
+    clock = FakeClock()
+    cache = DeckCache(max_bytes=1000, ttl=10, clock=clock)
+    cache.put("a", 1, size=10)
+    clock.now = 5
+    cache.put("b", 2, size=10)
+    clock.now = 11
+    assert cache.get("a") == (False, None)
+    assert cache.get("b") == (True, 2)
+    clock.now = 16
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["bytes"] == 0 and stats["expirations"] == 2
+
+
+def test_get_or_compute_counts_hits_and_kinds():
+    cache = DeckCache()
+    calls = []
+    for _ in range(3):
+        value = cache.get_or_compute(("voci", "abc"), lambda: calls.append(1) or [("a", "b")])
+    assert value == [("a", "b")] and len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == 2 / 3
+    assert stats["kinds"]["voci"][0] == 1
+
+
+def test_concurrent_access_keeps_byte_count_consistent():
+    cache = DeckCache(max_bytes=5000)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(2000):
+            key = rng.randrange(100)
+            cache.get_or_compute(key, lambda: "x" * rng.randrange(200))
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["bytes"] == sum(size for _, size in stats["kinds"].values()) <= 5000
+    assert stats["hits"] + stats["misses"] == 8 * 2000
+
+
+def test_concurrent_misses_compute_once():
+    cache = DeckCache()
+    calls = []
+    started = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "Deck"
+
+    def worker():
+        started.wait()
+        results.append(cache.get_or_compute(("voci", "abc"), compute))
+
+    results = []
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["Deck"] * 8 and len(calls) == 1
+
+
+def test_failed_compute_is_not_cached():
+    cache = DeckCache()
+
+    def fail():
+        raise ValueError("kaputt")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("key", fail)
+    assert cache.get_or_compute("key", lambda: 1) == 1
+
+
+def test_distractor_pool_does_not_grow_after_caching():
+    pool = DistractorPool(["Haus"] * 50 + ["Hund", "Katze"] + [f"Wort {i}" for i in range(20)])
+    size = estimate_size(pool)
+    rng = random.Random(1)
+    for back in set(pool.backs):
+        pool.sample(back, 3, rng)
+    assert estimate_size(pool) == size
+
+
+def test_estimate_size_counts_shared_objects_once():
+    word = "Erklärung " * 100
+    assert estimate_size([word] * 1000) < estimate_size([word + str(i) for i in range(1000)]) / 10
+    pool = DistractorPool(f"Wort {i}" for i in range(1000))
+    assert estimate_size(pool) > estimate_size(pool.backs)
+
+
+def test_content_digest_matches_for_text_and_utf8_bytes():
+    assert content_digest("Straße") == content_digest("Straße".encode("utf-8")) == content_digest(memoryview("Straße".encode()))
+
+
+def test_prebuilt_indexes_do_not_change_output():
+    cards = [(f"Wort {i}", f"Übersetzung {i}") for i in range(30)]
+    random.seed(3)
+    plain = generate_inline_single(cards)
+    random.seed(3)
+    assert generate_inline_single(cards, pool=DistractorPool(back for back, _ in cards)) == plain
+
+    deck = [{"front": f"Begriff {i}", "clean_backs": [f"Erklärung {i}"]} for i in range(20)]
+    assert format_line_output(deck, 0, "T", 4, random.Random(1)) == format_line_output(
+        deck, 0, "T", 4, random.Random(1), card_index=CardIndex(deck)
+    )
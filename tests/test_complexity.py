@@ -0,0 +1,294 @@
+import json
+import math
+import random
+import time
+from collections import Counter
+
+import pytest
+
+from olat_core import (
+    DistractorPool, balanced_schedule, create_groups, generate_inline_group, generate_inline_single, group_choices,
+    generate_questions, inline_single_item, parse_flashcards, parse_flashcards_json, read_flashcards,
+)
+
+# Eigenschaftsbasierte Tests mit zufälligen (aber reproduzierbaren) Eingaben sowie
+# Zeit- und Operationsschranken, damit superlineares Verhalten automatisch auffällt.
+
+SEEDS = range(25)
+
+
+class CountingRandom(random.Random):
+    """Random that counts how many random numbers were drawn."""
+
+    def __init__(self, seed=None):
+        self.calls = 0
+        super().__init__(seed)
+
+    def random(self):
+        self.calls += 1
+        return super().random()
+
+    def getrandbits(self, k):
+        self.calls += 1
+        return super().getrandbits(k)
+
+
+def random_text(rng, max_len=12):
+    alphabet = "abcdefghijklmnopqrstuvwxyzäöüßÄÖÜ éè📌🔍👉-"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, max_len))).strip() or "x"
+
+
+def random_deck_text(rng, num_cards, back_lines=3, newline="\n"):
+    """Random plain text deck with noisy separators (extra blank and whitespace-only lines)."""
+    blocks = []
+    for _ in range(num_cards):
+        lines = [random_text(rng)] + [random_text(rng, 40) for _ in range(rng.randint(1, back_lines))]
+        blocks.append(newline.join(lines))
+    separators = [newline * 2, newline * 3, newline + "  " + newline, newline + "\t" + newline * 2]
+    return "".join(block + rng.choice(separators) for block in blocks)
+
+
+def voci_deck(num_cards, distinct_backs=None):
+    distinct_backs = distinct_backs or num_cards
+    return [(f"Wort {i % distinct_backs}", f"Übersetzung {i}") for i in range(num_cards)]
+
+
+def dragdrop_deck(num_cards, back_lines=3, distinct_backs=None):
+    distinct_backs = distinct_backs or num_cards
+    return [
+        {"front": f"Begriff {i}", "clean_backs": [f"Erklärung {j} zu {i % distinct_backs}" for j in range(back_lines)]}
+        for i in range(num_cards)
+    ]
+
+
+def best_time(fn, *args, repeat=3):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def assert_roughly_linear(fn, make_args, n, factor=8, slack=4):
+    """Fails if growing the input by `factor` grows the runtime by much more than `factor`."""
+    small = best_time(fn, *make_args(n))
+    large = best_time(fn, *make_args(n * factor))
+    assert large <= factor * slack * max(small, 1e-3), (small, large)
+
+
+# --- Parser ---
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_flashcards_invariants(seed):
+    rng = random.Random(seed)
+    text = random_deck_text(rng, rng.randint(0, 40))
+    flashcards, max_back_lines = parse_flashcards(text)
+    assert max_back_lines == max((len(card["clean_backs"]) for card in flashcards), default=0)
+    for card in flashcards:
+        assert card["front"] and card["clean_backs"]
+        assert "ß" not in card["front"]
+        for back in [card["front"], *card["clean_backs"]]:
+            assert "\n" not in back and "\r" not in back
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_crlf_decks_parse_like_lf(seed):
+    rng = random.Random(seed)
+    text = random_deck_text(rng, rng.randint(1, 30))
+    assert parse_flashcards(text.replace("\n", "\r\n")) == parse_flashcards(text)
+    assert read_flashcards(text.replace("\n", "\r\n")) == read_flashcards(text)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_read_flashcards_invariants(seed):
+    rng = random.Random(seed)
+    num_cards = rng.randint(0, 40)
+    flashcards = read_flashcards(random_deck_text(rng, num_cards))
+    assert len(flashcards) == num_cards
+    for back, front in flashcards:
+        assert back and front
+
+
+def test_pathological_plain_text_is_fast():
+    giant_block = "\n".join(f"Zeile {i}" for i in range(200_000))
+    blank_lines = "\n" * 200_000 + "a\nb" + "\n \n" * 50_000
+    started = time.perf_counter()
+    flashcards, max_back_lines = parse_flashcards(giant_block)
+    assert len(flashcards) == 1 and max_back_lines == 199_999
+    assert read_flashcards(giant_block) == [("Zeile 0", "Zeile 1")]
+    assert parse_flashcards(blank_lines)[0] == [{"front": "a", "clean_backs": ["b"]}]
+    assert time.perf_counter() - started < 2.0
+
+
+def test_parse_flashcards_json_deeply_nested():
+    deep = "[" * 100_000 + "]" * 100_000
+    messages = []
+    assert parse_flashcards_json(deep, messages) == ([], 0)
+    assert messages and messages[0][0] == "error"
+
+    nested_item = json.dumps([{"question": "q", "answer": "a"}, {"x": json.loads("[" * 500 + "]" * 500)}])
+    messages = []
+    flashcards, _ = parse_flashcards_json(nested_item, messages)
+    assert len(flashcards) == 1
+    assert all(len(text) < 500 for _, text in messages)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_flashcards_json_invariants(seed):
+    rng = random.Random(seed)
+    items = [
+        {"question": random_text(rng), "answer": "\n".join(random_text(rng, 30) for _ in range(rng.randint(0, 3)))}
+        for _ in range(rng.randint(0, 30))
+    ]
+    messages = []
+    flashcards, max_back_lines = parse_flashcards_json(json.dumps(items), messages)
+    assert len(flashcards) + len(messages) == len(items)
+    assert max_back_lines == max((len(card["clean_backs"]) for card in flashcards), default=0)
+
+
+# --- Gruppen ---
+
+@pytest.mark.parametrize("num_cards", [1, 2, 3, 5, 7, 12, 13, 30])
+@pytest.mark.parametrize("group_size", [2, 3, 4, 5, 10, 15])
+def test_create_groups_terminates_and_covers(num_cards, group_size):
+    flashcards = voci_deck(num_cards)
+    started = time.perf_counter()
+    groups = create_groups(flashcards, group_size, random.Random(num_cards * 31 + group_size))
+    assert time.perf_counter() - started < 0.5
+    assert len(groups) == max(math.ceil(2 * num_cards / group_size), 2 if num_cards < group_size else 0)
+    assert all(len(group) == group_size for group in groups)
+    counts = Counter(card for group in groups for card in group)
+    assert set(counts) == set(flashcards)
+    assert min(counts.values()) >= 2
+    if num_cards >= group_size:
+        assert all(len(set(group)) == group_size for group in groups)
+
+
+def test_create_groups_empty_deck():
+    assert create_groups([], 3) == []
+
+
+@pytest.mark.parametrize("distinct_backs", [1, 2, None])
+def test_generate_inline_group_records(distinct_backs):
+    groups = create_groups(voci_deck(40, distinct_backs), 4, random.Random(0))
+    output = generate_inline_group(groups, 4)
+    records = [record for record in output.split("\n\n") if record]
+    assert len(records) == len(groups)
+    for record in records:
+        assert record.count("\nText\t") == 4
+
+
+def test_generate_inline_group_is_deterministic():
+    groups = create_groups(voci_deck(60, distinct_backs=25), 6, random.Random(2))
+    outputs = set()
+    for seed in range(5):
+        random.seed(seed)
+        outputs.add(generate_inline_group(groups, 6))
+    assert len(outputs) == 1
+
+
+@pytest.mark.parametrize("max_distractors", [None, 1, 3, 50])
+@pytest.mark.parametrize("seed", range(5))
+def test_group_choices_exclude_own_answer(seed, max_distractors):
+    rng = random.Random(seed)
+    group = [(f"Wort {rng.randrange(8)}", f"Übersetzung {i}") for i in range(rng.randint(1, 12))]
+    distinct = list(dict.fromkeys(back for back, _ in group))
+    expected = len(distinct) - 1 if max_distractors is None else min(max_distractors, len(distinct) - 1)
+    for (back, _), choices in zip(group, group_choices(group, max_distractors)):
+        assert back not in choices
+        assert len(choices) == len(set(choices)) == expected
+        if max_distractors is None:
+            assert choices == [other for other in distinct if other != back]
+
+
+def test_group_choices_cap_spreads_distractors():
+    group = [(f"Wort {i}", f"Übersetzung {i}") for i in range(10)]
+    used = Counter(choice for choices in group_choices(group, 3) for choice in choices)
+    assert set(used.values()) == {3}
+
+
+def test_group_choices_shuffle_uses_rng():
+    group = [(f"Wort {i}", f"Übersetzung {i}") for i in range(12)]
+    first = group_choices(group, 5, shuffle=True, rng=random.Random(9))
+    assert first == group_choices(group, 5, shuffle=True, rng=random.Random(9))
+    assert first != group_choices(group, 5)
+    assert [sorted(choices) for choices in first] == [sorted(choices) for choices in group_choices(group, 5)]
+
+
+# --- Drag&drop ---
+
+@pytest.mark.parametrize("num_cards", [0, 1, 7])
+def test_generate_questions_small_decks(num_cards):
+    assert generate_questions(dragdrop_deck(num_cards), 0, "T", 6) == []
+
+
+@pytest.mark.parametrize("n_correct", [1, 4, 6, 8])
+@pytest.mark.parametrize("distinct_backs", [1, None])
+@pytest.mark.parametrize("schedule", ["random", "balanced"])
+def test_generate_questions_rows(n_correct, distinct_backs, schedule):
+    flashcards = dragdrop_deck(8, distinct_backs=distinct_backs)
+    questions = generate_questions(flashcards, 1, "T", n_correct, random.Random(n_correct), schedule)
+    assert questions
+    for question in questions:
+        assert len(question) == 5 + 8
+        assert all(len(row) == n_correct + 1 for row in question)
+        assert sum(1 for row in question[5:] if "0.5" in row[1:]) == n_correct
+
+
+def test_generate_questions_all_identical_cards():
+    flashcards = [{"front": "F", "clean_backs": ["b"]} for _ in range(50)]
+    assert generate_questions(flashcards, 0, "T", 4) == []
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_balanced_schedule_coverage(seed):
+    rng = random.Random(seed)
+    num_cards = rng.randint(1, 60)
+    n_correct = rng.randint(1, min(6, num_cards))
+    coverage = rng.randint(1, 4)
+    blocks = balanced_schedule(num_cards, n_correct, coverage, rng)
+    assert len(blocks) == math.ceil(num_cards * coverage / n_correct)
+    assert all(len(set(block)) == len(block) == n_correct for block in blocks)
+    counts = Counter(index for block in blocks for index in block)
+    assert len(counts) == num_cards and min(counts.values()) >= coverage
+
+
+# --- Zeit- und Operationsschranken ---
+
+@pytest.mark.parametrize("fn,make_deck", [
+    (lambda deck, rng: create_groups(deck, 5, rng), voci_deck),
+    (lambda deck, rng: generate_inline_single(deck), voci_deck),
+    (lambda deck, rng: generate_questions(deck, 0, "T", 4, rng), dragdrop_deck),
+    (lambda deck, rng: generate_questions(deck, 0, "T", 4, rng, "balanced", 2), dragdrop_deck),
+])
+def test_random_draws_are_linear(fn, make_deck):
+    for num_cards in (100, 1000):
+        rng = CountingRandom(num_cards)
+        fn(make_deck(num_cards), rng)
+        assert rng.calls <= 40 * num_cards
+
+
+def test_distractor_sampling_with_one_dominant_back():
+    flashcards = voci_deck(2000, distinct_backs=1) + voci_deck(5)
+    rng = CountingRandom(0)
+    pool = DistractorPool(card[0] for card in flashcards)
+    for back, front in flashcards:
+        inline_single_item(back, front, flashcards, rng, pool)
+    assert rng.calls <= 200 * len(flashcards)
+
+
+@pytest.mark.parametrize("fn,make_args,n", [
+    (read_flashcards, lambda n: (random_deck_text(random.Random(n), n),), 2000),
+    (parse_flashcards, lambda n: (random_deck_text(random.Random(n), n),), 2000),
+    (parse_flashcards_json, lambda n: (json.dumps([{"question": f"q{i}", "answer": f"a{i}\nb{i}"} for i in range(n)]),), 2000),
+    (create_groups, lambda n: (voci_deck(n), 5, random.Random(n)), 2000),
+    (generate_inline_single, lambda n: (voci_deck(n, distinct_backs=3),), 1000),
+    (generate_inline_group, lambda n: (create_groups(voci_deck(n), 10, random.Random(n)), 10), 2000),
+    # Eine einzige grosse Gruppe: mit begrenzter Auswahlliste linear in der Gruppengrösse
+    (generate_inline_group, lambda n: ([voci_deck(n)], n, None, 5), 2000),
+    (generate_questions, lambda n: (dragdrop_deck(n), 0, "T", 4, random.Random(n)), 500),
+    (generate_questions, lambda n: (dragdrop_deck(n, distinct_backs=1), 0, "T", 4, random.Random(n), "balanced"), 500),
+])
+def test_runtime_scales_linearly(fn, make_args, n):
+    assert_roughly_linear(fn, make_args, n)
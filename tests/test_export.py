@@ -0,0 +1,235 @@
+import csv
+import io
+import os
+import random
+import zipfile
+
+import pytest
+
+from olat_core import (
+    create_groups, format_line_output, generate_fib_group, generate_fib_single, parse_flashcards,
+    read_flashcards, split_blocks,
+)
+import olat_export
+from olat_export import (
+    EXPORT_FORMATS, INDEX_FILE, convert_deck, export_deck, export_file, scan_decks, sync_folder, watch, write_zip,
+)
+
+
+def deck_text(num_cards, back_lines=3):
+    return "\n\n".join(
+        "\n".join([f"Begriff {i}"] + [f"📌 Erklärung {j} zu Begriff {i}\tmit Tab" for j in range(back_lines)])
+        for i in range(num_cards)
+    )
+
+
+def contents(files):
+    return {name: sink.getvalue().decode("utf-8") for name, sink in files.items()}
+
+
+def test_export_matches_single_format_generators():
+    text = deck_text(30)
+    flashcards = read_flashcards(text)
+    files = contents(export_deck(split_blocks(text), ["fib_single", "fib_group"], group_size=3, rng=random.Random(7)))
+    assert files["fib_single.txt"] == generate_fib_single(flashcards)
+    assert files["fib_group.txt"] == generate_fib_group(create_groups(flashcards, 3, random.Random(7)), 3)
+
+
+def test_export_dragdrop_matches_line_output():
+    text = deck_text(20, back_lines=2)
+    dragdrop_cards, _ = parse_flashcards(text)
+    files = contents(export_deck(split_blocks(text), ["dragdrop"], n_correct=3, rng=random.Random(5)))
+    rng = random.Random(5)
+    expected = [format_line_output(dragdrop_cards, line, "Lernkarteien", 3, rng) for line in range(2)]
+    assert [files["dragdrop_zeile_1.txt"], files["dragdrop_zeile_2.txt"]] == expected
+
+
+def test_export_all_formats_record_counts():
+    text = deck_text(25)
+    files = contents(export_deck(split_blocks(text), EXPORT_FORMATS, group_size=4))
+    assert files["inline_single.txt"].count("Type\tInlinechoice") == 25
+    groups = files["inline_group.txt"].count("Type\tInlinechoice")
+    assert groups == files["fib_group.txt"].count("Type\tFIB") >= 2 * 25 / 4
+    assert {name for name in files if name.startswith("dragdrop")} == {f"dragdrop_zeile_{i}.txt" for i in (1, 2, 3)}
+
+    tsv_rows = [line.split("\t") for line in files["quizlet.tsv"].splitlines()]
+    assert len(tsv_rows) == 25 and all(len(row) == 2 for row in tsv_rows)
+    csv_rows = list(csv.reader(io.StringIO(files["quizlet.csv"])))
+    assert csv_rows[0] == ["Begriff 0", "; ".join(f"📌 Erklärung {j} zu Begriff 0\tmit Tab" for j in range(3))]
+
+
+def test_export_small_deck_skips_empty_dragdrop():
+    files = export_deck(split_blocks(deck_text(5)), ["fib_single", "dragdrop"])
+    assert list(files) == ["fib_single.txt"]
+
+
+def test_export_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        export_deck([], ["pdf"])
+
+
+def test_export_progress_is_monotonic_and_complete():
+    calls = []
+    export_deck(split_blocks(deck_text(40)), group_size=3, progress=lambda done, total: calls.append((done, total)))
+    assert all(a[0] <= b[0] for a, b in zip(calls, calls[1:]))
+    assert calls[-1][0] == calls[-1][1]
+
+
+def test_export_file_writes_zip(tmp_path):
+    deck = tmp_path / "deck.txt"
+    deck.write_bytes(deck_text(12).replace("📌 ", "").replace("Begriff", "Straße").encode("cp1252"))
+    out = io.BytesIO()
+    names, results = export_file(deck, out, ["fib_single", "quizlet_tsv", "dragdrop"], validate=True)
+    # Die Tabulatoren im Kartentext sprengen die OLAT-Spalten, Quizlet ersetzt sie
+    assert {name for name, (_, issues) in results.items() if issues} == {"fib_single.txt", *(n for n in names if n.startswith("dragdrop"))}
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == names
+        assert zf.read("quizlet.tsv").decode("utf-8").startswith("Straße 0\t")
+
+
+def test_write_zip_roundtrip():
+    files = export_deck(split_blocks(deck_text(10)), ["inline_single", "quizlet_csv"])
+    expected = contents(files)
+    out = io.BytesIO()
+    write_zip(files, out)
+    with zipfile.ZipFile(out) as zf:
+        assert {name: zf.read(name).decode("utf-8") for name in zf.namelist()} == expected
+
+
+# --- Beobachtungsmodus ---
+
+
+def write_deck(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_sync_folder_converts_only_new_or_changed_decks(tmp_path, monkeypatch):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write_deck(src / "a.txt", deck_text(3))
+    write_deck(src / "kurs" / "b.txt", deck_text(4))
+    write_deck(src / "notizen.md", "kein Deck")
+
+    summary = sync_folder(src, out, ["fib_single"])
+    assert sorted(summary["converted"]) == ["a.txt", os.path.join("kurs", "b.txt")]
+    assert (out / "a.zip").exists() and (out / "kurs" / "b.zip").exists() and (out / INDEX_FILE).exists()
+
+    # Ohne Änderungen wird keine Datei gelesen und gehasht
+    def fail_digest(data):
+        raise AssertionError("Unveränderte Decks dürfen nicht gelesen werden")
+    with monkeypatch.context() as patch:
+        patch.setattr(olat_export, "content_digest", fail_digest)
+        summary = sync_folder(src, out, ["fib_single"])
+    assert summary["converted"] == [] and summary["unchanged"] == 2
+
+    # Nur der Zeitstempel ändert sich: gehasht, aber nicht neu konvertiert
+    stat = (src / "a.txt").stat()
+    os.utime(src / "a.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert sync_folder(src, out, ["fib_single"])["converted"] == []
+
+    write_deck(src / "a.txt", deck_text(5))
+    assert sync_folder(src, out, ["fib_single"])["converted"] == ["a.txt"]
+    with zipfile.ZipFile(out / "a.zip") as zf:
+        assert zf.read("fib_single.txt").decode("utf-8").count("Type\tFIB") == 5
+
+
+def test_sync_folder_removes_outputs_of_deleted_decks(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write_deck(src / "a.txt", deck_text(3))
+    write_deck(src / "b.txt", deck_text(3))
+    sync_folder(src, out, ["fib_single"])
+    (src / "b.txt").unlink()
+    summary = sync_folder(src, out, ["fib_single"])
+    assert summary["removed"] == ["b.txt"]
+    assert not (out / "b.zip").exists() and (out / "a.zip").exists()
+
+
+def test_sync_folder_reconverts_all_when_options_change(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    write_deck(src / "a.txt", deck_text(3))
+    sync_folder(src, out, ["fib_single"])
+    assert sync_folder(src, out, ["fib_single", "quizlet_csv"])["converted"] == ["a.txt"]
+    assert sync_folder(src, out, ["fib_single", "quizlet_csv"], group_size=3)["converted"] == ["a.txt"]
+
+
+def test_sync_folder_skips_its_own_output_dir(tmp_path):
+    src = tmp_path / "src"
+    write_deck(src / "a.txt", deck_text(3))
+    out = src / "olat_exports"
+    sync_folder(src, out, ["fib_single"])
+    write_deck(out / "fremd.txt", deck_text(3))
+    assert sync_folder(src, out, ["fib_single"])["converted"] == []
+
+
+def test_sync_folder_with_seed_is_reproducible(tmp_path):
+    src = tmp_path / "src"
+    write_deck(src / "a.txt", deck_text(12))
+    for out in (tmp_path / "out1", tmp_path / "out2"):
+        sync_folder(src, out, ["inline_single", "dragdrop"], seed=4)
+    with zipfile.ZipFile(tmp_path / "out1" / "a.zip") as first, zipfile.ZipFile(tmp_path / "out2" / "a.zip") as second:
+        assert [first.read(n) for n in first.namelist()] == [second.read(n) for n in second.namelist()]
+
+
+class Listing(list):
+    """Stand-in for the context manager returned by os.scandir."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_scan_decks_skips_entries_deleted_during_the_scan(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    write_deck(src / "a.txt", deck_text(1))
+    write_deck(src / "weg.txt", deck_text(1))
+    write_deck(src / "kurs" / "b.txt", deck_text(1))
+    real_scandir = os.scandir
+
+    def scandir_then_delete(path):
+        entries = Listing(real_scandir(path))
+        # Zwischen dem Auflisten und stat() verschwinden eine Datei und ein Unterordner
+        if os.path.exists(src / "weg.txt"):
+            (src / "weg.txt").unlink()
+            (src / "kurs" / "b.txt").unlink()
+            (src / "kurs").rmdir()
+        return entries
+
+    monkeypatch.setattr(olat_export.os, "scandir", scandir_then_delete)
+    assert [rel_path for rel_path, _, _ in scan_decks(src)] == ["a.txt"]
+
+
+def test_scan_decks_raises_for_missing_root(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(scan_decks(tmp_path / "fehlt"))
+
+
+def test_convert_deck_removes_temporary_file_on_error(tmp_path, monkeypatch):
+    def failing_export(data, out, *args, **kwargs):
+        out.write(b"halb")
+        raise ValueError("kaputt")
+
+    monkeypatch.setattr(olat_export, "export_bytes", failing_export)
+    target = tmp_path / "out" / "a.zip"
+    with pytest.raises(ValueError):
+        convert_deck(deck_text(3).encode("utf-8"), str(target), ["fib_single"], False, {}, None)
+    assert os.listdir(tmp_path / "out") == []
+
+
+def test_watch_reports_errors_and_keeps_polling(tmp_path, monkeypatch, capsys):
+    calls = []
+
+    def flaky_sync(src_dir, out_dir, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise FileNotFoundError("Ordner fehlt")
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return {"converted": ["a.txt"], "removed": [], "failed": [], "unchanged": 0, "problems": {}}
+
+    monkeypatch.setattr(olat_export, "sync_folder", flaky_sync)
+    watch(tmp_path / "src", tmp_path / "out", interval=0)
+    output = capsys.readouterr().out
+    assert len(calls) == 3
+    assert "Fehler: Ordner fehlt" in output and "Konvertiert: a.txt" in output
@@ -0,0 +1,67 @@
+import codecs
+import random
+import time
+
+import pytest
+
+from olat_core import iter_blocks, read_flashcards, read_flashcards_blocks, split_blocks
+from olat_ingest import UploadTooLarge, decode_bytes, ingest_bytes
+
+DECK = "Haus\nmaison\n\nStraße\nrue\r\n\r\nÉcole\nschool\n"
+
+
+def parse_voci(chunks):
+    return read_flashcards_blocks(iter_blocks(chunks))
+
+
+def random_chunks(rng, text):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 8))))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_iter_blocks_matches_split_blocks(seed):
+    rng = random.Random(seed)
+    pieces = ["a", "bc", "ä", "\n", "\r\n", "\r", " ", "\t", "\n\n", "\r\n\r\n", "\n \n", "　", "\x0c"]
+    text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+    assert list(iter_blocks(random_chunks(rng, text))) == split_blocks(text)
+
+
+@pytest.mark.parametrize("encoding,expected", [
+    ("utf-8", "utf-8"),
+    ("utf-8-sig", "utf-8"),
+    ("utf-16", "utf-16-le" if codecs.BOM_UTF16 == codecs.BOM_UTF16_LE else "utf-16-be"),
+    ("utf-32", "utf-32-le" if codecs.BOM_UTF32 == codecs.BOM_UTF32_LE else "utf-32-be"),
+    ("cp1252", "cp1252"),
+])
+def test_ingest_bytes_encodings(encoding, expected):
+    flashcards, detected = ingest_bytes(DECK.encode(encoding), parse_voci, chunk_size=3)
+    assert detected == expected
+    assert flashcards == read_flashcards(DECK)
+
+
+def test_ingest_bytes_falls_back_to_latin1():
+    # 0x81 ist weder gültiges UTF-8 noch in cp1252 belegt
+    assert decode_bytes(b"a\x81b") == ("a\x81b", "latin-1")
+
+
+@pytest.mark.parametrize("data,expected", [
+    # UTF-8-BOM, danach aber cp1252-kodierter Text
+    (codecs.BOM_UTF8 + "Haus\nmaison\n\nStraße\nrue".encode("cp1252"), ("Haus\nmaison\n\nStraße\nrue", "cp1252")),
+    # cp1252-Text, der mit "ÿþ" beginnt und daher wie eine UTF-16-LE-BOM aussieht
+    ("ÿþHaus\nmaison".encode("cp1252"), ("ÿþHaus\nmaison", "cp1252")),
+])
+def test_ingest_bytes_falls_back_after_wrong_bom(data, expected):
+    assert decode_bytes(data) == expected
+
+
+def test_ingest_bytes_size_limit():
+    with pytest.raises(UploadTooLarge):
+        ingest_bytes(b"x" * 11, parse_voci, max_bytes=10)
+
+
+def test_iter_blocks_giant_line_is_linear():
+    chunks = ["x" * 63 + " "] * 50_000
+    started = time.perf_counter()
+    assert len(list(iter_blocks(chunks))) == 1
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from olat_jobs import Job, job_key, submit_job
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPoolExecutor(max_workers=1)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def blocking_job(job, release, steps=3):
+    """Runs through `steps` checkpoints, waiting for `release` before each."""
+    for step in range(steps):
+        release.wait(5)
+        job.report("Schritt", step, steps)
+    return "fertig"
+
+
+def test_identical_running_job_is_reused(pool):
+    state = {}
+    release = threading.Event()
+    key = job_key("deck", 2)
+    first = submit_job(state, "job", pool, key, blocking_job, release)
+    assert submit_job(state, "job", pool, key, blocking_job, release) is first
+    release.set()
+    assert first.wait(5) and first.result == "fertig"
+    # Ein abgeschlossener Auftrag wird neu gestartet
+    assert submit_job(state, "job", pool, key, blocking_job, release) is not first
+
+
+def test_different_job_cancels_the_running_one(pool):
+    state = {}
+    release = threading.Event()
+    first = submit_job(state, "job", pool, job_key("a"), blocking_job, release)
+    second = submit_job(state, "job", pool, job_key("b"), blocking_job, release)
+    release.set()
+    assert first.wait(5) and second.wait(5)
+    assert first.cancelled and first.result is None
+    assert not second.cancelled and second.result == "fertig"
+    assert state["job"] is second
+
+
+def test_cancel_stops_at_next_checkpoint(pool):
+    release = threading.Event()
+    job = submit_job({}, "job", pool, job_key("a"), blocking_job, release)
+    job.cancel()
+    release.set()
+    assert job.wait(5)
+    assert job.cancelled and job.result is None and job.error is None
+
+
+def test_queued_job_is_cancelled_without_waiting(pool):
+    release = threading.Event()
+    running = submit_job({}, "a", pool, job_key("a"), blocking_job, release)
+    queued = submit_job({}, "b", pool, job_key("b"), blocking_job, release)
+    queued.cancel()
+    assert queued.done and queued.cancelled
+    release.set()
+    assert running.wait(5) and running.result == "fertig"
+    assert queued.result is None
+
+
+def test_errors_are_stored_on_the_job(pool):
+    def failing(job):
+        raise ValueError("kaputt")
+
+    job = submit_job({}, "job", pool, job_key("a"), failing)
+    assert job.wait(5)
+    assert isinstance(job.error, ValueError) and not job.cancelled
+
+
+def test_stages_split_the_progress():
+    job = Job("key")
+    first, second = job.stages(["eins", "zwei"])
+    first(1, 2)
+    assert job.stage == "eins" and job.fraction == pytest.approx(0.25)
+    second(2, 2)
+    assert job.stage == "zwei" and job.fraction == pytest.approx(1.0)
@@ -0,0 +1,103 @@
+from olat_core import fib_single_item, generate_single_from_bank
+from olat_store import QuestionBank, card_hash, get_or_generate
+
+
+def make_bank():
+    return QuestionBank(":memory:")
+
+
+def test_get_or_generate_only_generates_missing_keys():
+    bank = make_bank()
+    calls = []
+
+    def generate(key, value):
+        calls.append(key)
+        return value.upper()
+
+    bodies, n_new = get_or_generate(bank, "test", [("a", "x"), ("b", "y")], generate)
+    assert bodies == ["X", "Y"] and n_new == 2
+    bodies, n_new = get_or_generate(bank, "test", [("b", "y"), ("c", "z"), ("c", "z")], generate)
+    assert bodies == ["Y", "Z", "Z"] and n_new == 1
+    assert calls == ["a", "b", "c"]
+    assert bank.count_items("test") == 3
+
+
+def test_items_are_separated_by_params_and_seed():
+    bank = make_bank()
+    get_or_generate(bank, "test", [("a", "x")], lambda key, value: "eins", params={"n": 1})
+    bodies, n_new = get_or_generate(bank, "test", [("a", "x")], lambda key, value: "zwei", params={"n": 2})
+    assert bodies == ["zwei"] and n_new == 1
+    bodies, n_new = get_or_generate(bank, "test", [("a", "x")], lambda key, value: "drei", params={"n": 1}, seed=1)
+    assert bodies == ["drei"] and n_new == 1
+
+
+def test_save_and_load_deck():
+    bank = make_bank()
+    cards = [("Haus", "house"), ("Hund", "dog")]
+    key = bank.save_deck(cards)
+    assert bank.load_deck(key) == cards
+    assert bank.load_deck(card_hash("unbekannt")) is None
+
+
+def test_single_from_bank_counts_new_cards():
+    bank = make_bank()
+    deck = [("Haus", "house"), ("Hund", "dog"), ("Katze", "cat"), ("Baum", "tree")]
+    first = generate_single_from_bank(bank, deck, seed=0)
+    assert first[2] == 4
+    assert generate_single_from_bank(bank, deck, seed=0) == first[:2] + (0,)
+
+
+def test_single_from_bank_fib_follows_changed_cards():
+    bank = make_bank()
+    deck = [("Haus", "house"), ("Hund", "dog"), ("Katze", "cat")]
+    generate_single_from_bank(bank, deck, seed=0)
+    changed = [("Haus", "home"), ("Hund", "dog"), ("Katze", "cat")]
+    _, fib, _ = generate_single_from_bank(bank, changed, seed=0)
+    assert fib_single_item("Haus", "home") in fib
+    assert "house" not in fib
+    assert bank.count_items("fib_single") == 4
+
+
+def test_single_from_bank_does_not_reuse_distractors_of_other_decks():
+    bank = make_bank()
+    deck_a = [("Haus", "house"), ("Hund", "dog"), ("Katze", "cat"), ("Baum", "tree")]
+    deck_b = [("Haus", "house"), ("rot", "red"), ("blau", "blue"), ("grün", "green")]
+    generate_single_from_bank(bank, deck_a, seed=0)
+    inline, fib, new_cards = generate_single_from_bank(bank, deck_b, seed=0)
+    assert new_cards == 4
+    assert not any(word in inline for word in ("Hund", "Katze", "Baum"))
+    # FIB-Fragen hängen nur von der Karte ab und werden weiterverwendet
+    assert bank.count_items("fib_single") == 7
+
+
+def test_single_from_bank_reports_progress():
+    bank = make_bank()
+    deck = [("Haus", "house"), ("Hund", "dog"), ("Katze", "cat")]
+    calls = []
+    generate_single_from_bank(bank, deck, seed=0, progress=lambda done, total: calls.append((done, total)))
+    assert calls == [(0, 3), (1, 3), (2, 3), (3, 3)]
+
+
+def test_single_from_bank_adding_a_card_only_generates_that_card():
+    bank = make_bank()
+    deck = [(f"Wort {i}", f"word {i}") for i in range(100)]
+    inline, _, _ = generate_single_from_bank(bank, deck, seed=0)
+    grown = deck + [("Haus", "house")]
+    grown_inline, _, new_cards = generate_single_from_bank(bank, grown, seed=0)
+    assert new_cards == 1
+    assert grown_inline.startswith(inline)
+
+
+def test_single_from_bank_regenerates_cards_whose_distractors_vanished():
+    bank = make_bank()
+    deck = [(f"Wort {i}", f"word {i}") for i in range(20)]
+    inline, _, _ = generate_single_from_bank(bank, deck, seed=0)
+    removed = deck[0][0]
+    affected = {
+        front for question, (_, front) in zip(inline.split("\n\n")[:-1], deck)
+        if removed in question.split("\n")[-1].split("\t")[1].split("|")
+    }
+    shrunk = deck[1:]
+    shrunk_inline, _, new_cards = generate_single_from_bank(bank, shrunk, seed=0)
+    assert affected and new_cards == len(affected)
+    assert removed not in shrunk_inline
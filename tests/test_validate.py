@@ -0,0 +1,105 @@
+import random
+import time
+import zipfile
+
+import pytest
+
+from olat_core import (
+    create_groups, format_line_output, generate_fib_group, generate_fib_single, generate_inline_group,
+    generate_inline_single, parse_flashcards,
+)
+from olat_validate import format_issues, validate_output, validate_path
+
+
+def voci_deck(num_cards):
+    return [(f"Wort {i}", f"Übersetzung {i}") for i in range(num_cards)]
+
+
+def dragdrop_deck(num_cards, back_lines=2):
+    return [{"front": f"Begriff {i}", "clean_backs": [f"Erklärung {j} zu {i}" for j in range(back_lines)]}
+            for i in range(num_cards)]
+
+
+def messages(file_name, content):
+    return [message for _, message in validate_output(file_name, content)[1]]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_generated_outputs_are_valid(seed):
+    rng = random.Random(seed)
+    random.seed(seed)
+    cards = voci_deck(rng.randint(3, 40))
+    group_size = rng.randint(2, 6)
+    groups = create_groups(cards, group_size, rng)
+    outputs = {
+        "inline_single.txt": generate_inline_single(cards),
+        "fib_single.txt": generate_fib_single(cards),
+        "inline_group.txt": generate_inline_group(groups, group_size),
+        "fib_group.txt": generate_fib_group(groups, group_size),
+        "dragdrop.txt": format_line_output(dragdrop_deck(rng.randint(8, 30)), 0, "Titel", rng.randint(1, 6), rng),
+    }
+    for file_name, content in outputs.items():
+        records, issues = validate_output(file_name, content)
+        assert records and not issues, (file_name, issues)
+
+
+def test_empty_choice_list_in_group_with_one_distinct_back():
+    output = generate_inline_group([[("Haus", "maison"), ("Haus", "house")]], 2)
+    assert messages("inline_group.txt", output) == ["Leere Auswahlliste oder leere Auswahl."] * 2
+
+
+def test_stray_tab_and_points_mismatch():
+    output = "Type\tFIB\nTitle\tLücken\nPoints\t2\nText\tmai\tson = \n1\tHaus\t20\n\n"
+    assert messages("fib.txt", output) == [
+        "'Text' hat 3 statt 2 Spalten (Tabulator im Kartentext?).",
+        "Points 2 passt nicht zu 1 Lücke(n).",
+    ]
+
+
+def test_dragdrop_column_count_and_duplicate_fronts():
+    broken_back = dragdrop_deck(10)
+    broken_back[0]["clean_backs"][0] = "mit\tTab"
+    assert any("Spalten" in m for m in messages("dd.txt", format_line_output(broken_back, 0, "T", 8, random.Random(1))))
+
+    # Gleiche Vorderseiten: eine Erklärung erhält keine richtige Zuordnung
+    same_front, _ = parse_flashcards("\n\n".join(f"Gleich\nErklärung {i}" for i in range(10)))
+    assert any("statt genau einer" in m for m in messages("dd.txt", format_line_output(same_front, 0, "T", 4)))
+
+
+def test_unknown_type_and_quizlet_rows():
+    assert messages("x.txt", "Type\tEssay\nTitle\tx\n") == ["Unbekannter Fragetyp: 'Type Essay'."]
+    assert messages("quizlet.tsv", "a\tb\nc\n\td\n") == ["1 statt 2 Spalten.", "Begriff oder Definition ist leer."]
+    assert messages("quizlet.csv", 'a,"b\nc"\nd,e\n') == []
+
+
+def test_format_issues_limits_output():
+    lines = format_issues([(i, "x") for i in range(60)], limit=3)
+    assert lines == ["Zeile 0: x", "Zeile 1: x", "Zeile 2: x", "… und 57 weitere Probleme."]
+
+
+def test_validate_path_reads_zip_entries(tmp_path):
+    path = tmp_path / "out.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("fib_single.txt", generate_fib_single(voci_deck(5)))
+        zf.writestr("inline_single.txt", "Type\tInlinechoice\n")
+    results = validate_path(path)
+    assert results[f"{path}:fib_single.txt"] == (5, [])
+    assert len(results[f"{path}:inline_single.txt"][1]) == 2
+
+
+def best_time(fn, *args):
+    times = []
+    for _ in range(3):
+        started = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def test_validator_is_linear_on_large_outputs():
+    small = format_line_output(dragdrop_deck(500), 0, "T", 4, random.Random(0))
+    large = small * 16  # ca. 8 MB
+    assert len(large) > 4_000_000
+    t_small = best_time(validate_output, "dd.txt", small)
+    t_large = best_time(validate_output, "dd.txt", large)
+    assert t_large <= 16 * 4 * max(t_small, 1e-3), (t_small, t_large)